@@ -1,12 +1,105 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import asyncio
+import hashlib
+import hmac
+import os
+import sys
 import traceback
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
-app = FastAPI(title="SHL Assessment Recommendation API")
+from backend.api.serialization import (
+    FragmentRenderer,
+    ndjson_error_line,
+    ndjson_line,
+    to_eval_response,
+    to_response,
+)
+from backend.cache import RedisStore, ResponseCache
+from backend.metrics import REGISTRY, cache_lines, server_timing
+
+# Embedding + FAISS search run on their own pool, away from the event loop
+ENCODE_WORKERS = int(os.getenv("SHL_ENCODE_WORKERS", "8"))
+MAX_CONCURRENCY = int(os.getenv("SHL_MAX_CONCURRENCY", "64"))
+
+# /recommend_batch encodes and streams queries in chunks of this size
+BATCH_CHUNK_SIZE = int(os.getenv("SHL_BATCH_CHUNK_SIZE", "64"))
+
+# Largest top_k a request may ask for (FAISS needs k >= 1)
+MAX_TOP_K = int(os.getenv("SHL_MAX_TOP_K", "50"))
+# Per-request bounds on /recommend_batch: queries per call, and the
+# client-chosen rerank depth (clamped, as the cross-encoder cost scales with it)
+MAX_BATCH_QUERIES = int(os.getenv("SHL_MAX_BATCH_QUERIES", "1000"))
+MAX_RERANK_DEPTH = int(os.getenv("SHL_MAX_RERANK_DEPTH", "50"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=ENCODE_WORKERS, thread_name_prefix="shl-encode"
+)
+_slots = asyncio.Semaphore(MAX_CONCURRENCY)
+
+# Eager mode loads and warms everything before /ready; lazy mode (default)
+# keeps memory low on constrained hosts until the first request
+EAGER_LOAD = os.getenv("SHL_EAGER_LOAD", "0") == "1"
+
+# Attach a Server-Timing header to every response, not only when a client
+# sends X-Debug-Timing: 1
+TIMING_HEADER = os.getenv("SHL_TIMING_HEADER", "0") == "1"
+
+# Cross-encoder rerank depth per endpoint (0 = first-stage order): deep on
+# /recommend_eval and /recommend_batch to measure the recall gain, shallow
+# on /recommend for the SLO
+RECOMMEND_RERANK_DEPTH = int(os.getenv("SHL_RECOMMEND_RERANK_DEPTH", "0"))
+EVAL_RERANK_DEPTH = int(os.getenv("SHL_EVAL_RERANK_DEPTH", "0"))
+
+# Response bodies are joined from per-item JSON encoded once per snapshot
+render_recommend = FragmentRenderer(to_response)
+render_eval = FragmentRenderer(to_eval_response)
+
+# Shared secret for /admin/* endpoints; unset disables them
+ADMIN_TOKEN = os.getenv("SHL_ADMIN_TOKEN")
+
+# Serialized /recommend and /recommend_eval bodies, keyed on the index
+# snapshot version so a rebuild invalidates them (0 bytes disables)
+RESPONSE_CACHE_BYTES = int(os.getenv("SHL_RESPONSE_CACHE_BYTES", str(16 * 1024 * 1024)))
+# /recommend depends on the LLM: fresh for TTL seconds, then served stale
+# for up to STALE more while one background request refreshes it
+RESPONSE_CACHE_TTL = float(os.getenv("SHL_RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_STALE = float(os.getenv("SHL_RESPONSE_CACHE_STALE", "86400"))
+# Bodies built from a fallback (reranker loading or late, LLM timeout) are
+# only reused for this long, on both endpoints
+RESPONSE_CACHE_DEGRADED_TTL = float(os.getenv("SHL_RESPONSE_CACHE_DEGRADED_TTL", "30"))
+# Optional tier shared by workers and hosts, e.g. redis://127.0.0.1:6379/0
+RESPONSE_CACHE_REDIS = os.getenv("SHL_RESPONSE_CACHE_REDIS")
+
+_responses = None
+if RESPONSE_CACHE_BYTES > 0:
+    _responses = ResponseCache(
+        RESPONSE_CACHE_BYTES,
+        store=RedisStore(RESPONSE_CACHE_REDIS, prefix="shl:response:")
+        if RESPONSE_CACHE_REDIS else None,
+    )
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if EAGER_LOAD:
+        recommender = get_recommender()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(_executor, recommender.warmup)
+        if max(RECOMMEND_RERANK_DEPTH, EVAL_RERANK_DEPTH) > 0:
+            await loop.run_in_executor(_executor, recommender.load_reranker)
+        print(f"✅ Recommender warmed up: {recommender.load_timings}")
+    yield
+    _executor.shutdown(wait=False)
+
+
+app = FastAPI(title="SHL Assessment Recommendation API", lifespan=lifespan)
 
 # -------------------------------------------------
 # ROOT ENDPOINT (RENDER HEALTH CHECK NEEDS THIS)
@@ -22,6 +115,22 @@ def root():
 def health():
     return {"status": "healthy"}
 
+# -------------------------------------------------
+# READINESS (EAGER MODE: ONLY AFTER WARM-UP)
+# -------------------------------------------------
+@app.get("/ready")
+def ready():
+    if not EAGER_LOAD:
+        return {"status": "ready", "mode": "lazy"}
+    if _recommender is None or not _recommender.ready:
+        raise HTTPException(status_code=503, detail="Recommender is loading")
+    return {
+        "status": "ready",
+        "mode": "eager",
+        "load_timings": _recommender.load_timings,
+        "snapshot": _recommender.snapshot_info(),
+    }
+
 # -------------------------------------------------
 # LAZY-LOADED RECOMMENDER
 # -------------------------------------------------
@@ -33,14 +142,117 @@ def get_recommender():
         print("Initializing SHLRecommender...")
         from backend.rag.recommender import SHLRecommender
         _recommender = SHLRecommender()
+        # Every snapshot, including hot reloads, is encoded before it serves
+        _recommender.prepare_hooks.extend([render_recommend.prepare, render_eval.prepare])
+        # Picks up snapshots published by build_index.py (every worker polls)
+        _recommender.start_watcher()
     return _recommender
 
+# -------------------------------------------------
+# CACHE / RUNTIME STATS
+# -------------------------------------------------
+@app.get("/stats")
+def stats():
+    stats = dict(get_recommender().stats())
+    if _responses is not None:
+        stats["responses"] = _responses.stats()
+    return stats
+
+
+def _cache_metrics():
+    caches = {}
+    if _responses is not None:
+        caches["responses"] = _responses.stats()
+    if _recommender is None:
+        return cache_lines(caches)
+    caches.update(_recommender.stats())
+
+    # Only report the parse cache once the LLM module has been imported
+    query_parser = sys.modules.get("backend.llm.query_parser")
+    if query_parser is not None:
+        caches["query_parse"] = query_parser.cache_stats()
+    return cache_lines(caches)
+
+
+REGISTRY.register_collector(_cache_metrics)
+
+# -------------------------------------------------
+# ADMIN: HOT INDEX RELOAD (THIS WORKER ONLY)
+# -------------------------------------------------
+@app.post("/admin/reload")
+async def admin_reload(force: bool = False,
+                       x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+    recommender = get_recommender()
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(_executor, recommender.reload, force)
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Reload failed: {e}")
+
+    return {**result, "snapshot": recommender.snapshot_info()}
+
+# -------------------------------------------------
+# PROMETHEUS METRICS
+# -------------------------------------------------
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+def want_timings(debug_header):
+    return {} if TIMING_HEADER or debug_header == "1" else None
+
+
+async def cached_response(recommender, endpoint, mode, req, compute, ttl=None):
+    """
+    (body, state) for one request: the cached body for (endpoint, mode,
+    query, top_k, snapshot version), else compute(snapshot), which
+    returns (body, degraded). The snapshot is pinned here, so a reload
+    cannot slip in between the key and the body. The first request of a
+    lazily loaded worker has no snapshot yet and is not cached.
+    """
+    if _responses is None or recommender.snapshot is None:
+        body, _ = await compute(None)
+        return body, "bypass"
+
+    with recommender.acquire() as snapshot:
+        parts = (endpoint, mode, str(req.top_k), str(snapshot.version), req.query)
+        key = hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+        return await _responses.aget(
+            key, lambda: compute(snapshot), ttl, RESPONSE_CACHE_STALE,
+            RESPONSE_CACHE_DEGRADED_TTL
+        )
+
+
+def json_response(body, state, timings):
+    headers = {"X-Cache": state}
+    if timings:
+        headers["Server-Timing"] = server_timing(timings)
+    return Response(body, media_type="application/json", headers=headers)
+
 # -------------------------------------------------
 # REQUEST / RESPONSE MODELS
 # -------------------------------------------------
 class QueryRequest(BaseModel):
     query: str
-    top_k: int = 10
+    top_k: int = Field(10, ge=1, le=MAX_TOP_K)
+
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str] = Field(max_length=MAX_BATCH_QUERIES)
+    top_k: int = Field(10, ge=1, le=MAX_TOP_K)
+    use_llm: bool = False
+    # None = SHL_EVAL_RERANK_DEPTH: the recall scripts evaluate through here.
+    # Clamped to SHL_MAX_RERANK_DEPTH
+    rerank_depth: Optional[int] = Field(None, ge=0)
 
 
 class AssessmentResponse(BaseModel):
@@ -55,28 +267,35 @@ class AssessmentResponse(BaseModel):
 # -------------------------------------------------
 # RECOMMEND ENDPOINT (LLM ENABLED)
 # -------------------------------------------------
+# response_model documents the shape; bodies are pre-encoded, not validated
 @app.post("/recommend", response_model=List[AssessmentResponse])
-def recommend(req: QueryRequest):
+async def recommend(req: QueryRequest,
+                    x_debug_timing: Optional[str] = Header(None)):
     try:
         recommender = get_recommender()
-        results = recommender.recommend(
-            req.query,
-            top_k=req.top_k,
-            use_llm=True
-        )
+        timings = want_timings(x_debug_timing)
+
+        async def compute(snapshot):
+            degraded = []
+            async with _slots:
+                body = await recommender.recommend_async(
+                    req.query,
+                    top_k=req.top_k,
+                    use_llm=True,
+                    executor=_executor,
+                    timings=timings,
+                    rerank_depth=RECOMMEND_RERANK_DEPTH,
+                    render=render_recommend,
+                    snapshot=snapshot,
+                    degraded=degraded
+                )
+            return body, bool(degraded)
 
-        return [
-            {
-                "url": r.get("url"),
-                "name": r.get("name"),
-                "adaptive_support": r.get("adaptive_support", "No"),
-                "description": r.get("description", ""),
-                "duration": int(r.get("duration", 0)),
-                "remote_support": r.get("remote_support", "Yes"),
-                "test_type": r.get("test_types_full", [])
-            }
-            for r in results
-        ]
+        body, state = await cached_response(
+            recommender, "recommend", f"rerank={RECOMMEND_RERANK_DEPTH}", req,
+            compute, ttl=RESPONSE_CACHE_TTL
+        )
+        return json_response(body, state, timings)
 
     except Exception as e:
         traceback.print_exc()
@@ -86,17 +305,69 @@ def recommend(req: QueryRequest):
 # EVALUATION ENDPOINT (LLM DISABLED)
 # -------------------------------------------------
 @app.post("/recommend_eval")
-def recommend_eval(req: QueryRequest):
+async def recommend_eval(req: QueryRequest,
+                         x_debug_timing: Optional[str] = Header(None)):
     try:
         recommender = get_recommender()
-        results = recommender.recommend(
-            req.query,
-            top_k=req.top_k,
-            use_llm=False
+        timings = want_timings(x_debug_timing)
+
+        async def compute(snapshot):
+            degraded = []
+            async with _slots:
+                body = await recommender.recommend_async(
+                    req.query,
+                    top_k=req.top_k,
+                    use_llm=False,
+                    executor=_executor,
+                    timings=timings,
+                    rerank_depth=EVAL_RERANK_DEPTH,
+                    render=render_eval,
+                    snapshot=snapshot,
+                    degraded=degraded
+                )
+            return body, bool(degraded)
+
+        # No LLM: the result only changes with the snapshot, so never stale
+        body, state = await cached_response(
+            recommender, "recommend_eval", f"rerank={EVAL_RERANK_DEPTH}", req,
+            compute
         )
-        return [{"url": r.get("url")} for r in results]
+        return json_response(body, state, timings)
 
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+# -------------------------------------------------
+# BATCH ENDPOINT (NDJSON, ONE LINE PER QUERY)
+# -------------------------------------------------
+@app.post("/recommend_batch")
+async def recommend_batch(req: BatchQueryRequest):
+    recommender = get_recommender()
+    depth = EVAL_RERANK_DEPTH if req.rerank_depth is None else req.rerank_depth
+    depth = min(depth, MAX_RERANK_DEPTH)
+
+    async def lines():
+        # The 200 status is sent before the first chunk runs: a failed
+        # chunk gets one error line per query instead of a cut-off body
+        for start in range(0, len(req.queries), BATCH_CHUNK_SIZE):
+            chunk = req.queries[start:start + BATCH_CHUNK_SIZE]
+            try:
+                async with _slots:
+                    bodies = await recommender.recommend_many_async(
+                        chunk,
+                        top_k=req.top_k,
+                        use_llm=req.use_llm,
+                        executor=_executor,
+                        render=render_recommend,
+                        rerank_depth=depth
+                    )
+            except Exception as e:
+                traceback.print_exc()
+                for query in chunk:
+                    yield ndjson_error_line(query, str(e))
+                continue
+            for query, body in zip(chunk, bodies):
+                yield ndjson_line(query, body)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,63 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder writes the same bytes
+    orjson = None
+
+
+def dumps(content):
+    """Compact UTF-8 JSON, as FastAPI's JSONResponse writes it."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def to_response(r):
+    return {
+        "url": r.get("url"),
+        "name": r.get("name"),
+        "adaptive_support": r.get("adaptive_support", "No"),
+        "description": r.get("description", ""),
+        "duration": int(r.get("duration") or 0),  # 0 = unknown
+        "remote_support": r.get("remote_support", "Yes"),
+        "test_type": r.get("test_types_full", [])
+    }
+
+
+def to_eval_response(r):
+    return {"url": r.get("url")}
+
+
+class FragmentRenderer:
+    """
+    Recommender `render` hook for one response shape. Each catalog row is
+    encoded once per snapshot; a response is the selected rows' fragments
+    joined into a JSON array, with no per-item dicts or encoding.
+    """
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.name = shape.__name__
+
+    def encode(self, record):
+        return dumps(self.shape(record))
+
+    def prepare(self, snapshot):
+        return snapshot.fragments(self.name, self.encode)
+
+    def __call__(self, snapshot, ids):
+        fragments = self.prepare(snapshot)
+        return b"[" + b",".join([fragments[i] for i in ids.tolist()]) + b"]"
+
+
+def ndjson_line(query, body):
+    """One /recommend_batch line around an already rendered results array."""
+    return b'{"query":' + dumps(query) + b',"results":' + body + b"}\n"
+
+
+def ndjson_error_line(query, message):
+    """A /recommend_batch line for a query whose chunk failed."""
+    return dumps({"query": query, "error": message}) + b"\n"
@@ -0,0 +1,377 @@
+import asyncio
+import math
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with optional TTL and byte budget."""
+
+    def __init__(self, max_entries=1024, max_bytes=None, ttl=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof or (lambda value: 0)
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        size = self.sizeof(value)
+
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+
+            self._data[key] = (value, expires_at, size)
+            self.bytes += size
+
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes is not None and self.bytes > self.max_bytes)
+            ):
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SQLiteStore:
+    """Persistent key -> bytes store shared by processes on the same host."""
+
+    def __init__(self, path, ttl=None, table="cache"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False,
+                                     timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value BLOB, expires_at REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return row[0]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(value), expires_at),
+            )
+            self._conn.commit()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class RedisStore:
+    """
+    Key -> bytes store in Redis (or a compatible server) shared across
+    hosts. Needs the optional `redis` package. Unreachable servers count
+    as misses so a shared-tier outage never fails a request. Every key
+    expires within `max_ttl` seconds: keys for old snapshot versions are
+    never read again.
+    """
+
+    def __init__(self, url, ttl=None, prefix="shl:", timeout=0.25,
+                 max_ttl=7 * 24 * 3600):
+        import redis
+        self.errors_type = redis.RedisError
+        # RESP2: also spoken by older and Redis-compatible servers
+        self.client = redis.Redis.from_url(
+            url, protocol=2, socket_timeout=timeout, socket_connect_timeout=timeout
+        )
+        self.ttl = ttl
+        self.max_ttl = max_ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key):
+        try:
+            value = self.client.get(self.prefix + key)
+        except self.errors_type:
+            self.errors += 1
+            value = None
+
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        ttl = min(ttl, self.max_ttl) if ttl else self.max_ttl
+        try:
+            self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+        except self.errors_type:
+            self.errors += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+class TieredCache:
+    """
+    Memory LRU in front of an optional byte store, with single-flight:
+    concurrent misses on the same key share one computation.
+    """
+
+    def __init__(self, memory, store=None, dumps=None, loads=None):
+        self.memory = memory
+        self.store = store
+        self.dumps = dumps
+        self.loads = loads
+
+        self._inflight = {}
+        self._ainflight = {}
+        self._lock = threading.Lock()
+        self.collapsed = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None or self.store is None:
+            return value
+
+        raw = self.store.get(key)
+        if raw is None:
+            return None
+
+        value = self.loads(raw)
+        self.memory.set(key, value)
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.memory.set(key, value, ttl)
+        if self.store is not None:
+            self.store.set(key, self.dumps(value), ttl)
+
+    # The store may be remote (Redis): async callers reach it on a thread
+    # so a slow or unreachable server never stalls the event loop
+    async def _aget(self, key):
+        value = self.memory.get(key)
+        if value is not None or self.store is None:
+            return value
+
+        raw = await asyncio.to_thread(self.store.get, key)
+        if raw is None:
+            return None
+
+        value = self.loads(raw)
+        self.memory.set(key, value)
+        return value
+
+    async def _aset(self, key, value, ttl=None):
+        self.memory.set(key, value, ttl)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, key, self.dumps(value), ttl)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_compute(self, key, compute):
+        """Async get_or_compute; compute is a coroutine function."""
+        value = await self._aget(key)
+        if value is not None:
+            return value
+
+        # Shielded so a caller timing out does not cancel the shared call
+        return await asyncio.shield(self._join(key, compute))
+
+    def _join(self, key, compute, ttl=None):
+        """
+        The task computing key, started unless one is already running.
+        `ttl` may be a function of the computed value.
+        """
+        task = self._ainflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._acompute(key, compute, ttl))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._ainflight[key] = task
+        else:
+            self.collapsed += 1
+        return task
+
+    async def _acompute(self, key, compute, ttl=None):
+        try:
+            value = await compute()
+            await self._aset(key, value, ttl(value) if callable(ttl) else ttl)
+            return value
+        finally:
+            self._ainflight.pop(key, None)
+
+    def stats(self):
+        stats = {"memory": self.memory.stats(), "collapsed": self.collapsed}
+        if self.store is not None:
+            stats["store"] = self.store.stats()
+        return stats
+
+
+class ResponseCache(TieredCache):
+    """
+    Pre-serialized response bodies under a byte budget, with
+    stale-while-revalidate: an entry is fresh for `ttl` seconds, then
+    served for up to `stale` more while one background task recomputes
+    it. Entries stored without a ttl never go stale. Degraded bodies
+    (built from fallbacks) are kept for `degraded_ttl` seconds, with no
+    stale window, so a cold start or slow dependency does not pin them.
+    """
+
+    # Wall-clock "fresh until" in front of the body in the shared store
+    HEADER = struct.Struct("<d")
+
+    def __init__(self, max_bytes, store=None):
+        super().__init__(
+            LRUCache(max_entries=1 << 30, max_bytes=max_bytes,
+                     sizeof=lambda entry: len(entry[0])),
+            store=store,
+            dumps=lambda entry: self.HEADER.pack(entry[1]) + entry[0],
+            loads=self._loads,
+        )
+        self.stale_hits = 0
+
+    def _loads(self, raw):
+        raw = bytes(raw)
+        return raw[self.HEADER.size:], self.HEADER.unpack_from(raw)[0]
+
+    def _join_entry(self, key, compute, ttl, stale, degraded_ttl):
+        degraded = False
+
+        async def entry():
+            nonlocal degraded
+            body, degraded = await compute()
+            fresh = degraded_ttl if degraded else ttl
+            return body, time.time() + fresh if fresh else math.inf
+
+        def expiry(_):
+            if degraded:
+                return degraded_ttl
+            return ttl + stale if ttl else None
+
+        return self._join(key, entry, expiry)
+
+    async def aget(self, key, compute, ttl=None, stale=0.0, degraded_ttl=30.0):
+        """
+        (body, state) for key; state is "hit", "stale" or "miss". compute
+        is a coroutine function returning (body bytes, degraded).
+        """
+        entry = await self._aget(key)
+        if entry is not None:
+            body, fresh_until = entry
+            if time.time() < fresh_until:
+                return body, "hit"
+
+            self.stale_hits += 1
+            if key not in self._ainflight:
+                self._join_entry(key, compute, ttl, stale, degraded_ttl)
+            return body, "stale"
+
+        body, _ = await asyncio.shield(
+            self._join_entry(key, compute, ttl, stale, degraded_ttl)
+        )
+        return body, "miss"
+
+    def stats(self):
+        return {**super().stats(), "stale_hits": self.stale_hits}
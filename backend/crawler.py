@@ -0,0 +1,285 @@
+import argparse
+import asyncio
+import json
+import re
+import time
+
+import httpx
+from bs4 import BeautifulSoup
+
+from backend.cache import SQLiteStore
+from backend.scraper import BASE_URL, ITEMS_PER_PAGE, SHLCatalogScraper
+
+HTTP_CACHE_PATH = "backend/data/http_cache.sqlite"
+
+# Transient statuses worth retrying (with Retry-After when the server sends it)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# "Approximate Completion Time in minutes = 30" / "= max 45"
+DURATION_RE = re.compile(r"minutes\s*=\s*(?:max\s*)?(\d+)", re.IGNORECASE)
+FALLBACK_DURATION_RE = re.compile(r"(\d+)\s*min", re.IGNORECASE)
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, in bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HTTPCache:
+    """Bodies and validators (ETag / Last-Modified) of earlier responses."""
+
+    def __init__(self, path=HTTP_CACHE_PATH):
+        self.store = SQLiteStore(path, table="http_cache") if path else None
+
+    def get(self, url):
+        raw = self.store.get(url) if self.store else None
+        if raw is None:
+            return None
+        header, _, body = bytes(raw).partition(b"\n")
+        return json.loads(header), body
+
+    def set(self, url, validators, body):
+        if self.store:
+            self.store.set(url, json.dumps(validators).encode("utf-8") + b"\n" + body)
+
+
+def parse_detail(html):
+    """Description, duration (minutes), job levels and languages from a product page."""
+    soup = BeautifulSoup(html, "html.parser")
+    sections = {}
+    for heading in soup.find_all(["h3", "h4"]):
+        body = heading.find_next_sibling(["p", "div", "ul"])
+        if body is not None:
+            sections[heading.get_text(strip=True).lower()] = body.get_text(" ", strip=True)
+
+    detail = {
+        "description": sections.get("description", ""),
+        "duration": None,
+        "job_levels": [],
+        "languages": [],
+    }
+
+    length = sections.get("assessment length", "")
+    match = DURATION_RE.search(length) or FALLBACK_DURATION_RE.search(length)
+    if match:
+        detail["duration"] = int(match.group(1))
+
+    # "Mid-Professional, Professional Individual Contributor,"
+    levels = sections.get("job levels", "")
+    detail["job_levels"] = [level.strip() for level in levels.split(",") if level.strip()]
+
+    languages = sections.get("languages", "")
+    detail["languages"] = [
+        language.strip() for language in languages.split(",") if language.strip()
+    ]
+    return detail
+
+
+class CatalogCrawler:
+    """
+    Async crawler for the Individual Test Solutions catalog and its
+    product pages: pooled connections, a token-bucket rate limit, bounded
+    concurrency and conditional GETs against an on-disk HTTP cache.
+    """
+
+    def __init__(self, base_url=BASE_URL, concurrency=8, rate=10.0, burst=None,
+                 cache_path=HTTP_CACHE_PATH, timeout=30.0, retries=3,
+                 max_pages=100, details=True):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst or concurrency
+        self.cache = HTTPCache(cache_path)
+        self.timeout = timeout
+        self.retries = retries
+        self.max_pages = max_pages
+        self.details = details
+        self.parser = SHLCatalogScraper(base_url)
+        self.stats = {}
+
+    # -------------------------------------------------
+    # HTTP
+    # -------------------------------------------------
+    async def fetch(self, client, url):
+        """Body of url, revalidated against the cache; None after retries fail."""
+        cached = self.cache.get(url)
+        headers = {}
+        if cached is not None:
+            validators, _ = cached
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        for attempt in range(self.retries):
+            delay = 0.5 * 2 ** attempt
+            try:
+                async with self._slots:
+                    await self._bucket.acquire()
+                    response = await client.get(url, headers=headers)
+            except httpx.TransportError as e:
+                print(f"[Retry {attempt + 1}] {url}: {e}")
+                await asyncio.sleep(delay)
+                continue
+
+            self.stats["requests"] += 1
+            self.stats["bytes"] += len(response.content)
+
+            if response.status_code == 304 and cached is not None:
+                self.stats["not_modified"] += 1
+                return cached[1]
+
+            if response.status_code in RETRY_STATUSES:
+                retry_after = response.headers.get("retry-after", "")
+                if retry_after.isdigit():
+                    delay = int(retry_after)
+                print(f"[Retry {attempt + 1}] {url}: HTTP {response.status_code}")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code != 200:
+                print(f"⚠️ {url}: HTTP {response.status_code}")
+                self.stats["failed"] += 1
+                return None
+
+            validators = {
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+            }
+            if any(validators.values()):
+                self.cache.set(url, validators, response.content)
+            return response.content
+
+        self.stats["failed"] += 1
+        return None
+
+    # -------------------------------------------------
+    # CATALOG + DETAIL PAGES
+    # -------------------------------------------------
+    async def crawl_catalog_page(self, client, start):
+        html = await self.fetch(client, f"{self.base_url}?start={start}&type=1")
+        if html is None:
+            return None
+
+        soup = BeautifulSoup(html, "html.parser")
+        products = []
+        for table in soup.find_all("table"):
+            for row in table.find_all("tr")[1:]:
+                product = self.parser.extract_product_basic_info(row)
+                if product:
+                    products.append(product)
+        return products
+
+    async def crawl_catalog(self, client):
+        """Fetch listing pages a wave at a time until one comes back empty."""
+        products = []
+        page = 0
+        while page < self.max_pages:
+            wave = range(page, min(page + self.concurrency, self.max_pages))
+            results = await asyncio.gather(*(
+                self.crawl_catalog_page(client, p * ITEMS_PER_PAGE) for p in wave
+            ))
+            for page_products in results:
+                products.extend(page_products or [])
+            if any(r == [] for r in results):
+                break
+            page += len(wave)
+
+        # Listing pages can overlap while the catalog changes underneath
+        return list({p["url"]: p for p in products}.values())
+
+    async def crawl_detail(self, client, product):
+        html = await self.fetch(client, product["url"])
+        if html is not None:
+            product.update(parse_detail(html))
+        return product
+
+    async def crawl(self):
+        self.stats = {"requests": 0, "not_modified": 0, "failed": 0, "bytes": 0}
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._bucket = TokenBucket(self.rate, self.burst)
+
+        start = time.perf_counter()
+        limits = httpx.Limits(
+            max_connections=self.concurrency,
+            max_keepalive_connections=self.concurrency,
+        )
+        async with httpx.AsyncClient(
+            headers=self.parser.headers,
+            limits=limits,
+            timeout=self.timeout,
+            follow_redirects=True,
+        ) as client:
+            products = await self.crawl_catalog(client)
+            print(f"📄 {len(products)} products in the catalog")
+
+            if self.details:
+                products = await asyncio.gather(
+                    *(self.crawl_detail(client, p) for p in products)
+                )
+
+        self.stats["seconds"] = round(time.perf_counter() - start, 2)
+        return list(products)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Crawl the SHL Individual Test Solutions catalog"
+    )
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="catalog URL, e.g. a local fixture server")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="average requests per second")
+    parser.add_argument("--cache", default=HTTP_CACHE_PATH,
+                        help="HTTP cache for conditional GETs ('' disables)")
+    parser.add_argument("--no-details", action="store_true",
+                        help="skip product detail pages")
+    parser.add_argument("--output-dir", default="backend/data")
+    args = parser.parse_args()
+
+    crawler = CatalogCrawler(
+        base_url=args.base_url,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        cache_path=args.cache or None,
+        details=not args.no_details,
+    )
+    products = asyncio.run(crawler.crawl())
+
+    stats = crawler.stats
+    print(
+        f"\n✅ {len(products)} products in {stats['seconds']}s: "
+        f"{stats['requests']} requests, {stats['not_modified']} not modified, "
+        f"{stats['failed']} failed, {stats['bytes'] / 1024:.1f} KB downloaded"
+    )
+
+    scraper = SHLCatalogScraper(args.base_url)
+    scraper.products = products
+    scraper.save_outputs(args.output_dir)
+    scraper.print_summary()
+
+    print("➡️ Next step: data_enricher.py")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,18 @@
+import re
+
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
+INPUT_PATH = Path("backend/data/shl_individual_tests.csv")
+OUTPUT_PATH = Path("backend/data/shl_products_enriched.csv")
+
+# Rows read, enriched and written per step; memory stays flat as catalogs grow
+CHUNK_SIZE = 5000
+
+# "['C', 'P']" (scraper CSV) or "C\nP"; single capital letters only, no eval
+TYPE_LETTER_RE = r"\b([A-Z])\b"
+
 
 class SHLDataEnricher:
     def __init__(self):
@@ -27,83 +39,115 @@ class SHLDataEnricher:
             "S": "Realistic simulations of job tasks"
         }
 
-    def enrich(self):
+        self.role_map = {
+            "java": ["Java Developer", "Backend Engineer"],
+            "python": ["Python Developer", "Software Engineer"],
+            "developer": ["Software Developer"],
+            "analyst": ["Analyst", "Business Analyst"],
+            "manager": ["Manager", "Team Lead"],
+            "sales": ["Sales Professional"],
+            "customer": ["Customer Support"],
+            "engineer": ["Engineer"],
+            "graduate": ["Graduate", "Entry Level"]
+        }
+        self._role_order = {key: i for i, key in enumerate(self.role_map)}
+        # One pass over each name; the lookahead also reports overlapping keys,
+        # matching a plain substring test per key
+        self._role_re = re.compile(
+            "(?=(" + "|".join(map(re.escape, self.role_map)) + "))"
+        )
+
+        # "Ability & Aptitude assessment: Cognitive abilities ..." per letter
+        self._type_sentences = {
+            t: f"{self.test_type_map[t]} assessment: {d}"
+            for t, d in self.test_type_descriptions.items()
+        }
+
+    def enrich(self, input_path=INPUT_PATH, output_path=OUTPUT_PATH,
+               chunksize=CHUNK_SIZE):
         print("🔄 Starting data enrichment...")
 
-        input_path = Path("backend/data/shl_individual_tests.csv")
-        output_path = Path("backend/data/shl_products_enriched.csv")
+        total = 0
+        for i, chunk in enumerate(self.iter_enriched(input_path, chunksize)):
+            chunk.to_csv(output_path, mode="w" if i == 0 else "a",
+                         header=i == 0, index=False, encoding="utf-8")
+            total += len(chunk)
 
-        df = pd.read_csv(input_path)
+        print(f"✅ Enriched data saved at: {output_path}")
+        print(f"📊 Total enriched assessments: {total}")
 
-        # Ensure test_types_list exists
-        df["test_types_list"] = df["test_types_list"].apply(
-            lambda x: eval(x) if isinstance(x, str) else []
-        )
+        return total
+
+    def iter_enriched(self, input_path=INPUT_PATH, chunksize=CHUNK_SIZE):
+        """Stream enriched chunks of the scraper CSV (e.g. into build_index)."""
+        for chunk in pd.read_csv(input_path, chunksize=chunksize):
+            yield self.enrich_frame(chunk)
+
+    def enrich_frame(self, df):
+        df = df.copy()
+
+        # Type columns only depend on the raw type string, which has few
+        # distinct values: parse and format each once, then broadcast by code
+        codes, raw_types = pd.factorize(df["test_types_list"].fillna("").astype(str))
+        letters = [re.findall(TYPE_LETTER_RE, raw) for raw in raw_types]
+
+        # Parse test type letters without eval
+        df["test_types_list"] = self._broadcast(letters, codes, df.index)
 
         # Map full test type names
-        df["test_types_full"] = df["test_types_list"].apply(
-            lambda types: [self.test_type_map.get(t, t) for t in types]
-        )
+        full = [[self.test_type_map.get(t, t) for t in types] for types in letters]
+        df["test_types_full"] = self._broadcast(full, codes, df.index)
 
         # Infer roles
-        df["inferred_roles"] = df["name"].apply(self._infer_roles)
+        df["inferred_roles"] = self._infer_roles(df["name"])
 
         # Create RAG-friendly description
-        df["embedding_text"] = df.apply(self._build_embedding_text, axis=1)
-
-        # Save enriched dataset
-        df.to_csv(output_path, index=False, encoding="utf-8")
-
-        print(f"✅ Enriched data saved at: {output_path}")
-        print(f"📊 Total enriched assessments: {len(df)}")
+        meanings = [
+            "".join(f". {self._type_sentences[t]}" for t in types if t in self._type_sentences)
+            for types in letters
+        ]
+        df["embedding_text"] = self._build_embedding_text(
+            df, self._broadcast(meanings, codes, df.index)
+        )
 
         return df
 
-    def _build_embedding_text(self, row):
-        parts = [
-            f"Assessment Name: {row['name']}",
-            f"Assessment Type: {', '.join(row['test_types_full'])}",
-        ]
+    @staticmethod
+    def _broadcast(values, codes, index):
+        """Expand one value per distinct key to one value per row."""
+        return pd.Series(values, dtype=object).take(codes).set_axis(index)
 
-        if row.get("remote_testing"):
-            parts.append("Remote testing available")
+    def _build_embedding_text(self, df, meanings):
+        remote = df.get("remote_testing", pd.Series(False, index=df.index))
+        adaptive = df.get("adaptive_irt", pd.Series(False, index=df.index))
 
-        if row.get("adaptive_irt"):
-            parts.append("Adaptive testing supported")
+        text = (
+            "Assessment Name: " + df["name"].astype(str)
+            + ". Assessment Type: " + df["test_types_full"].str.join(", ")
+        )
+        text += np.where(remote.fillna(False).astype(bool),
+                         ". Remote testing available", "")
+        text += np.where(adaptive.fillna(False).astype(bool),
+                         ". Adaptive testing supported", "")
 
         # Add test type meanings
-        for t in row["test_types_list"]:
-            if t in self.test_type_descriptions:
-                parts.append(
-                    f"{self.test_type_map[t]} assessment: {self.test_type_descriptions[t]}"
-                )
+        text += meanings
 
         # Add inferred roles
-        parts.append(f"Suitable for roles such as {', '.join(row['inferred_roles'])}")
+        text += ". Suitable for roles such as " + df["inferred_roles"].str.join(", ")
 
-        return ". ".join(parts)
+        return text
 
-    def _infer_roles(self, name):
-        name = name.lower()
-        roles = []
+    def _infer_roles(self, names):
+        # Every key found in each name, in one regex pass per name
+        found = names.fillna("").astype(str).str.lower().str.findall(self._role_re)
+        codes, key_sets = pd.factorize(found.str.join("|"))
 
-        mapping = {
-            "java": ["Java Developer", "Backend Engineer"],
-            "python": ["Python Developer", "Software Engineer"],
-            "developer": ["Software Developer"],
-            "analyst": ["Analyst", "Business Analyst"],
-            "manager": ["Manager", "Team Lead"],
-            "sales": ["Sales Professional"],
-            "customer": ["Customer Support"],
-            "engineer": ["Engineer"],
-            "graduate": ["Graduate", "Entry Level"]
-        }
-
-        for key, values in mapping.items():
-            if key in name:
-                roles.extend(values)
-
-        return roles if roles else ["General"]
+        roles = []
+        for keys in key_sets:
+            matched = sorted(set(filter(None, keys.split("|"))), key=self._role_order.get)
+            roles.append([r for key in matched for r in self.role_map[key]] or ["General"])
+        return self._broadcast(roles, codes, names.index)
 
 def main():
     print("=" * 70)
@@ -0,0 +1,118 @@
+import argparse
+import json
+import time
+from typing import List
+
+import numpy as np
+from pydantic import TypeAdapter
+
+from backend.api import serialization
+from backend.api.main import AssessmentResponse
+from backend.api.serialization import (
+    FragmentRenderer,
+    dumps,
+    ndjson_line,
+    to_response,
+)
+from backend.rag.recommender import IndexSnapshot
+from backend.vector_db import snapshots
+from backend.vector_db.catalog import Catalog
+
+
+def load_snapshot():
+    """The current snapshot's catalog only; no model or index needed."""
+    version, path = snapshots.resolve()
+    catalog = Catalog.load(path / snapshots.CATALOG_SUBDIR, mmap=True)
+    return IndexSnapshot(version, None, {}, catalog)
+
+
+def per_call_us(fn, requests, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for ids in requests:
+            fn(ids)
+        best = min(best, time.perf_counter() - start)
+    return best / len(requests) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per-request response serialization cost: pydantic vs fragments"
+    )
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=64,
+                        help="queries per /recommend_batch chunk")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timed passes; the fastest is reported")
+    args = parser.parse_args()
+
+    snapshot = load_snapshot()
+    catalog = snapshot.catalog
+    rng = np.random.default_rng(0)
+    rows = np.array([i for i in range(len(catalog)) if catalog.url(i)], dtype="int64")
+    requests = [rng.choice(rows, args.top_k, replace=False) for _ in range(args.requests)]
+    batches = [requests[i:i + args.batch_size]
+               for i in range(0, len(requests), args.batch_size)]
+    query = "Java developer who collaborates with business teams"
+
+    adapter = TypeAdapter(List[AssessmentResponse])
+    render = FragmentRenderer(to_response)
+    start = time.perf_counter()
+    render.prepare(snapshot)
+    prepare_ms = (time.perf_counter() - start) * 1000
+
+    # What response_model=List[AssessmentResponse] did per request:
+    # records -> dicts -> validate -> dump -> JSONResponse encoding
+    def pydantic_path(ids):
+        content = [to_response(r) for r in catalog.records(ids)]
+        validated = adapter.validate_python(content)
+        return json.dumps(
+            adapter.dump_python(validated, mode="json"),
+            ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+        ).encode("utf-8")
+
+    def dict_path(ids):
+        return dumps([to_response(r) for r in catalog.records(ids)])
+
+    def batch_dict_path(batch):
+        return b"".join(
+            (json.dumps({"query": query, "results": [
+                to_response(r) for r in catalog.records(ids)
+            ]}) + "\n").encode("utf-8")
+            for ids in batch
+        )
+
+    def batch_fragment_path(batch):
+        return b"".join(ndjson_line(query, render(snapshot, ids)) for ids in batch)
+
+    same = all(
+        pydantic_path(ids) == dict_path(ids) == render(snapshot, ids)
+        for ids in requests[:100]
+    )
+
+    print(f"Snapshot {snapshot.version}: {len(catalog)} rows, "
+          f"encoder {'orjson' if serialization.orjson else 'json'}, "
+          f"fragments built in {prepare_ms:.1f} ms")
+    print(f"Identical bodies across paths: {same}")
+    print(f"\n/recommend (top_k={args.top_k}), us per response")
+    single = {
+        "pydantic": per_call_us(pydantic_path, requests, args.repeat),
+        "dicts + encoder": per_call_us(dict_path, requests, args.repeat),
+        "fragments": per_call_us(lambda ids: render(snapshot, ids), requests, args.repeat),
+    }
+    for name, us in single.items():
+        print(f"  {name:<16} {us:8.1f}  ({single['pydantic'] / us:.1f}x)")
+
+    print(f"\n/recommend_batch ({args.batch_size} queries), us per chunk")
+    batch = {
+        "dicts + json": per_call_us(batch_dict_path, batches, args.repeat),
+        "fragments": per_call_us(batch_fragment_path, batches, args.repeat),
+    }
+    for name, us in batch.items():
+        print(f"  {name:<16} {us:8.1f}  ({batch['dicts + json'] / us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
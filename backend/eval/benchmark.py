@@ -0,0 +1,303 @@
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backend.rag.embedders import embedder_name
+from backend.rag.embedding_cache import EmbeddingCache
+from backend.llm.intent import (
+    INTENT_CONFIDENCE,
+    HTTPIntentParser,
+    LLMIntentParser,
+    load_intent_parser,
+)
+from backend.rag.chunking import AGGREGATIONS
+from backend.rag.recommender import (
+    CHUNK_AGGREGATION,
+    DENSE_WEIGHT,
+    LEXICAL_WEIGHT,
+    LONG_QUERY_WORDS,
+    MAX_QUERY_CHUNKS,
+    RERANK_BUDGET_MS,
+    RERANK_DEPTH,
+    RRF_K,
+    SHLRecommender,
+)
+
+DATASETS = {
+    "train": "backend/data/train.csv",
+    "test": "backend/data/test.csv",
+}
+TOP_K = 10
+
+# Metrics compared against a baseline run: (name, higher_is_better)
+REGRESSION_METRICS = [
+    ("p95_ms", False),
+    ("qps", True),
+]
+
+
+def canonicalize_shl_url(url):
+    if not isinstance(url, str):
+        return ""
+    url = url.strip().lower().rstrip("/")
+    url = url.replace(
+        "https://www.shl.com/solutions/products/",
+        "https://www.shl.com/"
+    )
+    return url
+
+
+def load_dataset(name):
+    df = pd.read_csv(DATASETS[name])
+    ground_truth = defaultdict(set)
+
+    if "Assessment_url" in df.columns:
+        for _, row in df.iterrows():
+            url = canonicalize_shl_url(row["Assessment_url"])
+            if "/products/product-catalog/view/" in url:
+                ground_truth[row["Query"]].add(url)
+
+    queries = list(dict.fromkeys(df["Query"].dropna()))
+    return queries, dict(ground_truth)
+
+
+def stub_llm(latency_ms):
+    """Deterministic stand-in for Gemini with a fixed round-trip time."""
+    behavioral = ("communicat", "collaborat", "teamwork", "leadership", "personality")
+    technical = ("java", "python", "sql", "developer", "engineer", "selenium")
+
+    def parse_query(query):
+        time.sleep(latency_ms / 1000.0)
+        q = query.lower()
+        has_b = any(w in q for w in behavioral)
+        has_t = any(w in q for w in technical)
+        intent = "mixed" if has_b == has_t else ("technical" if has_t else "behavioral")
+        return {"technical_skills": [], "behavioral_skills": [], "intent": intent}
+
+    return parse_query
+
+
+def quality(results, ground_truth, k):
+    recalls, aps = [], []
+    for query, true_urls in ground_truth.items():
+        preds = [canonicalize_shl_url(r["url"]) for r in results[query][:k]]
+
+        hits, precision_sum = 0, 0.0
+        for rank, url in enumerate(preds, start=1):
+            if url in true_urls:
+                hits += 1
+                precision_sum += hits / rank
+
+        recalls.append(len(set(preds) & true_urls) / len(true_urls))
+        aps.append(precision_sum / min(k, len(true_urls)))
+
+    return {
+        f"recall_at_{k}": round(float(np.mean(recalls)), 4),
+        f"map_at_{k}": round(float(np.mean(aps)), 4),
+        "queries": len(recalls),
+    }
+
+
+def run_level(recommender, queries, concurrency, repeat, top_k, use_llm):
+    jobs = queries * repeat
+    latencies = []
+    stages = defaultdict(list)
+    results = {}
+
+    def run(query):
+        timings = {}
+        start = time.perf_counter()
+        recs = recommender.recommend(query, top_k=top_k, use_llm=use_llm,
+                                     timings=timings)
+        return query, recs, time.perf_counter() - start, timings
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for query, recs, elapsed, timings in pool.map(run, jobs):
+            results[query] = recs
+            latencies.append(elapsed * 1000)
+            for name, seconds in timings.items():
+                stages[name].append(seconds * 1000)
+    wall = time.perf_counter() - start
+
+    def pct(values, q):
+        return round(float(np.percentile(values, q)), 3)
+
+    summary = {
+        "requests": len(jobs),
+        "qps": round(len(jobs) / wall, 2),
+        "p50_ms": pct(latencies, 50),
+        "p95_ms": pct(latencies, 95),
+        "p99_ms": pct(latencies, 99),
+        "stages_ms": {
+            name: {"mean": round(float(np.mean(v)), 3), "p95": pct(v, 95)}
+            for name, v in sorted(stages.items())
+        },
+    }
+    return summary, results
+
+
+def compare(report, baseline, tolerance, recall_tolerance):
+    """Return human-readable regressions of report versus baseline."""
+    failures = []
+
+    for name, value in baseline.get("quality", {}).items():
+        if name.startswith(("recall", "map")):
+            current = report["quality"].get(name, 0.0)
+            if current < value - recall_tolerance:
+                failures.append(f"{name}: {current} < baseline {value}")
+
+    for level, base in baseline.get("levels", {}).items():
+        current = report["levels"].get(level)
+        if current is None:
+            continue
+        for metric, higher_is_better in REGRESSION_METRICS:
+            old, new = base[metric], current[metric]
+            if higher_is_better and new < old * (1 - tolerance):
+                failures.append(f"c={level} {metric}: {new} < baseline {old}")
+            if not higher_is_better and new > old * (1 + tolerance):
+                failures.append(f"c={level} {metric}: {new} > baseline {old}")
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="In-process quality + latency benchmark for SHLRecommender"
+    )
+    parser.add_argument("--dataset", choices=DATASETS, default="train")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="passes over the query set per level")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--llm", choices=["none", "rules", "stub", "http", "gemini"],
+                        default="none",
+                        help="intent parsing: off, rules only, or rules routed to an LLM")
+    parser.add_argument("--stub-latency-ms", type=float, default=300.0)
+    parser.add_argument("--intent-confidence", type=float, default=INTENT_CONFIDENCE,
+                        help="rule confidence that skips the LLM (> 1 = always ask it)")
+    parser.add_argument("--no-embed-cache", action="store_true",
+                        help="encode every query, as for first-time traffic")
+    parser.add_argument("--dense-weight", type=float, default=DENSE_WEIGHT)
+    parser.add_argument("--lexical-weight", type=float, default=LEXICAL_WEIGHT,
+                        help="BM25 weight in the rank fusion (0 = dense only)")
+    parser.add_argument("--rrf-k", type=int, default=RRF_K)
+    parser.add_argument("--long-query-words", type=int, default=LONG_QUERY_WORDS,
+                        help="split longer queries into sentence windows (0 = never)")
+    parser.add_argument("--max-chunks", type=int, default=MAX_QUERY_CHUNKS)
+    parser.add_argument("--chunk-aggregation", choices=AGGREGATIONS,
+                        default=CHUNK_AGGREGATION)
+    parser.add_argument("--rerank-depth", type=int, default=RERANK_DEPTH,
+                        help="cross-encoder rerank depth per bucket (0 = off)")
+    parser.add_argument("--rerank-budget-ms", type=float, default=RERANK_BUDGET_MS)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed relative p95/QPS regression")
+    parser.add_argument("--recall-tolerance", type=float, default=0.0)
+    args = parser.parse_args()
+
+    queries, ground_truth = load_dataset(args.dataset)
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    recommender = SHLRecommender(
+        dense_weight=args.dense_weight,
+        lexical_weight=args.lexical_weight,
+        rrf_k=args.rrf_k,
+        long_query_words=args.long_query_words,
+        max_query_chunks=args.max_chunks,
+        chunk_aggregation=args.chunk_aggregation,
+        rerank_depth=args.rerank_depth,
+        rerank_budget_ms=args.rerank_budget_ms,
+    )
+    if args.no_embed_cache:
+        recommender.embedding_cache = EmbeddingCache(embedder_name(), max_bytes=0,
+                                                     db_path=None)
+    if args.llm != "none":
+        llms = {
+            "stub": lambda: LLMIntentParser(stub_llm(args.stub_latency_ms), name="stub"),
+            "http": HTTPIntentParser,
+        }
+        recommender.intent_parser = load_intent_parser(
+            "rules" if args.llm == "rules" else "routed",
+            encode=recommender._encode_batch,
+            llm=llms[args.llm]() if args.llm in llms else None,
+        )
+        recommender.intent_parser.threshold = args.intent_confidence
+    recommender.warmup()
+    if args.rerank_depth > 0:
+        recommender.load_reranker()
+
+    report = {
+        "config": {
+            "dataset": args.dataset,
+            "queries": len(queries),
+            "repeat": args.repeat,
+            "top_k": args.top_k,
+            "llm": args.llm,
+            "intent_confidence": args.intent_confidence,
+            "embed_cache": not args.no_embed_cache,
+            "fusion": {
+                "dense_weight": args.dense_weight,
+                "lexical_weight": args.lexical_weight,
+                "rrf_k": args.rrf_k,
+            },
+            "long_queries": {
+                "words": args.long_query_words,
+                "max_chunks": args.max_chunks,
+                "aggregation": args.chunk_aggregation,
+            },
+            "rerank": {
+                "depth": args.rerank_depth,
+                "budget_ms": args.rerank_budget_ms,
+            },
+        },
+        "quality": {},
+        "levels": {},
+    }
+
+    use_llm = args.llm != "none"
+    for level in levels:
+        summary, results = run_level(
+            recommender, queries, level, args.repeat, args.top_k, use_llm
+        )
+        report["levels"][str(level)] = summary
+        if ground_truth and not report["quality"]:
+            report["quality"] = quality(results, ground_truth, args.top_k)
+
+        print(
+            f"c={level:<3} qps={summary['qps']:<8} p50={summary['p50_ms']}ms "
+            f"p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms"
+        )
+        for name, s in summary["stages_ms"].items():
+            print(f"      {name:<10} mean={s['mean']}ms p95={s['p95']}ms")
+
+    if report["quality"]:
+        print(f"\n✅ Quality: {report['quality']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved at {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        failures = compare(report, baseline, args.tolerance, args.recall_tolerance)
+        if failures:
+            print("\n❌ Regressions against baseline:")
+            for failure in failures:
+                print(f"  • {failure}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,7 @@
-import pickle
-from pathlib import Path
 import pandas as pd
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-META_PATH = BASE_DIR / "vector_db" / "metadata.pkl"
+from backend.vector_db import snapshots
+from backend.vector_db.catalog import Catalog
 
 def canonicalize(url):
     if not isinstance(url, str):
@@ -15,11 +13,12 @@ def canonicalize(url):
     )
     return url
 
-# Load metadata
-with open(META_PATH, "rb") as f:
-    metadata = pickle.load(f)
+# Load the live snapshot's catalog
+_, snapshot_dir = snapshots.resolve()
+catalog = Catalog.load(snapshot_dir / snapshots.CATALOG_SUBDIR)
 
-metadata_urls = {canonicalize(m["url"]) for m in metadata}
+metadata_urls = {canonicalize(catalog.url(i)) for i in range(len(catalog))}
+metadata_urls.discard("")  # rows deleted by incremental builds
 
 print(f"Total metadata entries: {len(metadata_urls)}")
 
@@ -0,0 +1,279 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.vector_db import snapshots
+
+CATALOG_DATA_PATH = "backend/data/shl_products_enriched.csv"
+# Small fixed query/document set for the quick in-process check (--fixture)
+FIXTURE_PATH = "backend/eval/fixtures/embedder_parity.json"
+
+# Environment each backend is measured under (module-level config is read at import)
+BACKENDS = {
+    "torch": {"SHL_EMBED_BACKEND": "torch"},
+    "onnx": {"SHL_EMBED_BACKEND": "onnx", "SHL_ONNX_QUANTIZED": "0"},
+    "onnx-int8": {"SHL_EMBED_BACKEND": "onnx", "SHL_ONNX_QUANTIZED": "1"},
+}
+
+
+def max_rss_mb():
+    # ru_maxrss is KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(dataset, top_k, vectors_path):
+    """Runs in a fresh process so startup time and memory are not shared."""
+    start = time.perf_counter()
+    from backend.rag.embedders import load_embedder
+    embedder = load_embedder(num_threads=int(os.getenv("SHL_NUM_THREADS", "0")))
+    startup_s = time.perf_counter() - start
+    model_rss_mb = max_rss_mb()
+
+    from backend.eval.benchmark import load_dataset, quality
+    from backend.rag.embedding_cache import EmbeddingCache
+    from backend.rag.recommender import SHLRecommender
+
+    queries, ground_truth = load_dataset(dataset)
+    texts = pd.read_csv(CATALOG_DATA_PATH)["embedding_text"].tolist()
+
+    embedder.encode(["warmup query for java developer"])
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        embedder.encode([query])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    catalog_vectors = np.vstack([
+        embedder.encode(texts[i:i + 64]) for i in range(0, len(texts), 64)
+    ])
+    query_vectors = embedder.encode(queries)
+    np.savez(vectors_path, catalog=catalog_vectors, queries=query_vectors)
+
+    recommender = SHLRecommender(batch_window_ms=0)
+    recommender.model = embedder
+    recommender.embedding_cache = EmbeddingCache(embedder.name, max_bytes=0,
+                                                 db_path=None)
+    results = {q: recommender.recommend(q, top_k=top_k) for q in queries}
+
+    return {
+        "name": embedder.name,
+        "startup_s": round(startup_s, 3),
+        "model_rss_mb": round(model_rss_mb, 1),
+        "peak_rss_mb": round(max_rss_mb(), 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "quality": quality(results, ground_truth, top_k) if ground_truth else {},
+    }
+
+
+def run_backend(backend, args, vectors_path):
+    env = {**os.environ, **BACKENDS[backend]}
+    cmd = [
+        sys.executable, "-m", "backend.eval.embedder_parity", "--measure",
+        "--dataset", args.dataset, "--top-k", str(args.top_k),
+        "--vectors", vectors_path,
+    ]
+    output = subprocess.run(cmd, env=env, check=True, capture_output=True,
+                            text=True).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+
+    with np.load(vectors_path) as vectors:
+        return report, vectors["catalog"], vectors["queries"]
+
+
+def cosine(a, b):
+    # Both sides are L2-normalized
+    return np.sum(a * b, axis=1)
+
+
+def top_k_agreement(ref_queries, ref_docs, queries, docs, k):
+    """Mean share of each query's reference top-k documents the candidate also ranks top-k."""
+    k = min(k, len(ref_docs))
+    ref_top = np.argsort(-(ref_queries @ ref_docs.T), axis=1, kind="stable")[:, :k]
+    top = np.argsort(-(queries @ docs.T), axis=1, kind="stable")[:, :k]
+    shared = [len(set(a) & set(b)) / k for a, b in zip(ref_top.tolist(), top.tolist())]
+    return float(np.mean(shared))
+
+
+def parity_failures(backend, result, args):
+    failures = []
+    if 1 - result["min_cosine"] > args.tolerance:
+        failures.append(
+            f"{backend}: min cosine {result['min_cosine']} below {1 - args.tolerance}"
+        )
+    if result["top_k_agreement"] < args.min_agreement:
+        failures.append(
+            f"{backend}: top-{args.top_k} agreement {result['top_k_agreement']} "
+            f"below {args.min_agreement}"
+        )
+    return failures
+
+
+def load_backend(backend):
+    """An in-process embedder configured like BACKENDS[backend]."""
+    from backend.rag.embedders import OnnxEmbedder, load_embedder
+    env = BACKENDS[backend]
+    if env["SHL_EMBED_BACKEND"] == "onnx":
+        return OnnxEmbedder(quantized=env.get("SHL_ONNX_QUANTIZED") == "1")
+    return load_embedder(env["SHL_EMBED_BACKEND"])
+
+
+def check_fixture(path, reference, candidates, args):
+    """
+    Quick automated check: every candidate against the reference on a
+    small fixed fixture, in one process. Returns (report, failures).
+    """
+    with open(path, encoding="utf-8") as f:
+        fixture = json.load(f)
+
+    def encode(backend):
+        embedder = load_backend(backend)
+        return embedder.encode(fixture["queries"]), embedder.encode(fixture["documents"])
+
+    ref_queries, ref_docs = encode(reference)
+    report, failures = {}, []
+    for backend in candidates:
+        queries, docs = encode(backend)
+        sims = np.concatenate([cosine(queries, ref_queries), cosine(docs, ref_docs)])
+        result = {
+            "min_cosine": round(float(sims.min()), 6),
+            "mean_cosine": round(float(sims.mean()), 6),
+            "top_k_agreement": round(
+                top_k_agreement(ref_queries, ref_docs, queries, docs, args.top_k), 4
+            ),
+        }
+        report[backend] = result
+        failures += parity_failures(backend, result, args)
+    return report, failures
+
+
+def built_index_vectors():
+    """The catalog vectors build_index.py wrote, in CSV row order, if available."""
+    _, path = snapshots.resolve()
+    state = snapshots.load_rows(path)
+    if state is not None:
+        rows = [state["rows"].get(url) for url in pd.read_csv(CATALOG_DATA_PATH)["url"]]
+        if any(row is None for row in rows):
+            return None  # CSV is newer than the snapshot
+        vectors = np.load(path / snapshots.VECTORS_FILE)
+        return vectors[[row["id"] for row in rows]]
+
+    # Legacy flat layout: only an exact index stores the vectors as built
+    import faiss
+    index = faiss.read_index(str(path / snapshots.INDEX_FILE))
+    if not isinstance(index, faiss.IndexFlat):
+        return None
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def finish(report, failures, args):
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved at {args.output}")
+
+    if failures:
+        print("\n❌ Parity check failed:")
+        for failure in failures:
+            print(f"  • {failure}")
+        sys.exit(1)
+    print("\n✅ Candidates match the reference backend")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare embedding backends: vector parity, Recall@K, "
+                    "startup time, memory and single-query latency"
+    )
+    parser.add_argument("--reference", choices=BACKENDS, default="torch")
+    parser.add_argument("--candidates", default="onnx,onnx-int8",
+                        help="comma-separated backends to check")
+    parser.add_argument("--dataset", choices=["train", "test"], default="train")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                        help="allowed 1 - cosine against the reference vectors")
+    parser.add_argument("--recall-tolerance", type=float, default=0.0)
+    parser.add_argument("--min-agreement", type=float, default=0.9,
+                        help="required share of the reference top-k per query")
+    parser.add_argument("--fixture", nargs="?", const=FIXTURE_PATH,
+                        help="only check vectors on a small fixture, in-process "
+                             f"(default {FIXTURE_PATH})")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--vectors", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.dataset, args.top_k, args.vectors)))
+        return
+
+    candidates = [c for c in args.candidates.split(",") if c]
+    if args.fixture:
+        report, failures = check_fixture(args.fixture, args.reference, candidates, args)
+        for backend, r in report.items():
+            print(f"{backend:<10} min_cos={r['min_cosine']} mean_cos={r['mean_cosine']} "
+                  f"top{args.top_k}_agreement={r['top_k_agreement']}")
+        finish(report, failures, args)
+        return
+
+    recall_key = f"recall_at_{args.top_k}"
+    report = {}
+    failures = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"🔄 Measuring {args.reference} (reference)...")
+        ref, ref_catalog, ref_queries = run_backend(
+            args.reference, args, os.path.join(tmp, "reference.npz")
+        )
+        report[args.reference] = ref
+
+        built = built_index_vectors()
+        if built is not None:
+            ref["vs_index_min_cosine"] = round(float(cosine(built, ref_catalog).min()), 6)
+
+        for backend in candidates:
+            print(f"🔄 Measuring {backend}...")
+            result, catalog, queries = run_backend(
+                backend, args, os.path.join(tmp, f"{backend}.npz")
+            )
+            sims = np.concatenate([
+                cosine(catalog, ref_catalog), cosine(queries, ref_queries)
+            ])
+            result["min_cosine"] = round(float(sims.min()), 6)
+            result["mean_cosine"] = round(float(sims.mean()), 6)
+            result["top_k_agreement"] = round(top_k_agreement(
+                ref_queries, ref_catalog, queries, catalog, args.top_k
+            ), 4)
+            if built is not None:
+                result["vs_index_min_cosine"] = round(
+                    float(cosine(built, catalog).min()), 6
+                )
+            report[backend] = result
+
+            failures += parity_failures(backend, result, args)
+            ref_recall = ref["quality"].get(recall_key)
+            recall = result["quality"].get(recall_key)
+            if ref_recall is not None and recall < ref_recall - args.recall_tolerance:
+                failures.append(f"{backend}: {recall_key} {recall} < {ref_recall}")
+
+    for backend, r in report.items():
+        print(
+            f"{backend:<10} startup={r['startup_s']}s rss={r['model_rss_mb']}MB "
+            f"p50={r['p50_ms']}ms p95={r['p95_ms']}ms "
+            f"{recall_key}={r['quality'].get(recall_key)} "
+            f"min_cos={r.get('min_cosine', 1.0)} "
+            f"top{args.top_k}_agreement={r.get('top_k_agreement', 1.0)}"
+        )
+    finish(report, failures, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from email.utils import formatdate
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from backend.scraper import ITEMS_PER_PAGE
+
+PRODUCTS_PATH = "backend/data/shl_individual_tests.json"
+CATALOG_PATH = "/products/product-catalog/"
+VIEW_PATH = CATALOG_PATH + "view/"
+
+
+def slug(url):
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def catalog_page(products):
+    rows = "".join(
+        "<tr>"
+        f'<td><a href="{VIEW_PATH}{slug(p["url"])}/">{escape(p["name"])}</a></td>'
+        f'<td>{"●" if p.get("remote_testing") else ""}</td>'
+        f'<td>{"●" if p.get("adaptive_irt") else ""}</td>'
+        f'<td>{"".join(f"<span>{t}</span>" for t in p.get("test_types_list", []))}</td>'
+        "</tr>"
+        for p in products
+    )
+    header = "<tr><th>Individual Test Solutions</th><th>Remote</th><th>Adaptive</th><th>Type</th></tr>"
+    return f"<html><body><table>{header}{rows}</table></body></html>"
+
+
+def detail_page(product):
+    minutes = 10 + len(product["name"]) % 50
+    return (
+        "<html><body>"
+        f"<h1>{escape(product['name'])}</h1>"
+        f"<div><h4>Description</h4><p>{escape(product['name'])} measures job-relevant skills.</p></div>"
+        "<div><h4>Job levels</h4><p>Mid-Professional, Professional Individual Contributor,</p></div>"
+        "<div><h4>Languages</h4><p>English (USA), French, German</p></div>"
+        f"<div><h4>Assessment length</h4><p>Approximate Completion Time in minutes = {minutes}</p></div>"
+        "</body></html>"
+    )
+
+
+class FixtureCatalog:
+    """Serves catalog + detail pages built from the scraped JSON, with validators."""
+
+    def __init__(self, products, latency_ms=0.0, fail_rate=0.0):
+        self.products = products
+        self.by_slug = {slug(p["url"]): p for p in products}
+        self.latency = latency_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self.stats = {"requests": 0, "not_modified": 0, "errors": 0, "bytes": 0}
+        self._lock = threading.Lock()
+
+    def render(self, path, query):
+        if path == CATALOG_PATH:
+            start = int(query.get("start", ["0"])[0])
+            return catalog_page(self.products[start:start + ITEMS_PER_PAGE])
+        if path.startswith(VIEW_PATH):
+            product = self.by_slug.get(path[len(VIEW_PATH):].strip("/"))
+            return detail_page(product) if product else None
+        return None
+
+    def count(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                self.stats[name] += value
+
+
+def make_handler(fixture):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/__stats":
+                return self.reply(200, json.dumps(fixture.stats).encode("utf-8"),
+                                  "application/json")
+
+            time.sleep(fixture.latency)
+            fixture.count(requests=1)
+
+            if random.random() < fixture.fail_rate:
+                fixture.count(errors=1)
+                return self.reply(503, b"busy", headers={"Retry-After": "0"})
+
+            html = fixture.render(url.path, parse_qs(url.query))
+            if html is None:
+                return self.reply(404, b"not found")
+
+            body = html.encode("utf-8")
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            validators = {"ETag": etag, "Last-Modified": fixture.last_modified}
+
+            if self.headers.get("If-None-Match") == etag:
+                fixture.count(not_modified=1)
+                return self.reply(304, b"", headers=validators)
+
+            fixture.count(bytes=len(body))
+            self.reply(200, body, headers=validators)
+
+        def reply(self, status, body, content_type="text/html; charset=utf-8",
+                  headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=8765, latency_ms=0.0, fail_rate=0.0, products_path=PRODUCTS_PATH):
+    """Start the fixture server on a background thread; returns (server, base_url)."""
+    with open(products_path, encoding="utf-8") as f:
+        products = json.load(f)
+
+    fixture = FixtureCatalog(products, latency_ms, fail_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(fixture))
+    server.fixture = fixture
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}{CATALOG_PATH}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local SHL catalog fixture for exercising backend.crawler"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="simulated server time per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="share of requests answered with 503")
+    args = parser.parse_args()
+
+    server, base_url = serve(args.port, args.latency_ms, args.fail_rate)
+    print(f"🧪 Fixture catalog at {base_url} (stats at /__stats)")
+    print(f"   python -m backend.crawler --base-url {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
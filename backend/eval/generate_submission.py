@@ -1,20 +1,31 @@
+import json
+import sys
 import pandas as pd
 import requests
 
-API_URL = "http://127.0.0.1:8000/recommend_eval"
+API_URL = "http://127.0.0.1:8000/recommend_batch"
 TOP_K = 10
 
 df = pd.read_csv("backend/data/test.csv")
 
 rows = []
 
-for query in df["Query"]:
-    response = requests.post(API_URL, json={"query": query})
-    results = response.json()
+# One round trip for the whole test set; results stream back as NDJSON
+response = requests.post(
+    API_URL, json={"queries": df["Query"].tolist(), "top_k": TOP_K}, stream=True
+)
+response.raise_for_status()
 
-    for r in results[:TOP_K]:
+for line in response.iter_lines():
+    if not line:
+        continue
+    item = json.loads(line)
+    if "error" in item:
+        sys.exit(f"❌ Server failed on {item['query']!r}: {item['error']}")
+
+    for r in item["results"][:TOP_K]:
         rows.append({
-            "Query": query,
+            "Query": item["query"],
             "Assessment_url": r["url"]
         })
 
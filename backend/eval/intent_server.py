@@ -0,0 +1,72 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.llm.intent import RuleIntentParser
+
+
+def make_handler(parser, latency_ms):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/parse":
+                return self.reply(404, {"detail": "not found"})
+
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                query = json.loads(self.rfile.read(length))["query"]
+            except (ValueError, KeyError):
+                return self.reply(400, {"detail": "expected {\"query\": ...}"})
+
+            # Stands in for an LLM round trip
+            time.sleep(latency_ms / 1000.0)
+            parsed = parser.parse(query)
+            self.reply(200, {
+                "technical_skills": parsed["technical_skills"],
+                "behavioral_skills": parsed["behavioral_skills"],
+                "intent": parsed["intent"],
+            })
+
+        def reply(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=8766, latency_ms=300.0):
+    """Start the stand-in on a background thread; returns (server, url)."""
+    handler = make_handler(RuleIntentParser(), latency_ms)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/parse"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local HTTP stand-in for the intent LLM (SHL_INTENT_LLM=http)"
+    )
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=300.0,
+                        help="simulated model time per request")
+    args = parser.parse_args()
+
+    server, url = serve(args.port, args.latency_ms)
+    print(f"🧪 Intent stand-in at {url}")
+    print(f"   SHL_INTENT_LLM=http SHL_INTENT_URL={url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
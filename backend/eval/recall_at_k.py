@@ -1,9 +1,14 @@
+import json
+import sys
 import pandas as pd
 import requests
 from collections import defaultdict
 
-API_URL = "http://127.0.0.1:8000/recommend_eval"
+API_URL = "http://127.0.0.1:8000/recommend_batch"
 TOP_K = 10
+# Optional cross-encoder depth (python -m backend.eval.recall_at_k 20; 0 = off),
+# otherwise the server's SHL_EVAL_RERANK_DEPTH
+RERANK_DEPTH = int(sys.argv[1]) if len(sys.argv) > 1 else None
 
 def canonicalize_shl_url(url):
     if not isinstance(url, str):
@@ -31,11 +36,23 @@ ground_truth = {
 
 recalls = []
 
-for i, (query, true_urls) in enumerate(ground_truth.items(), start=1):
-    response = requests.post(API_URL, json={"query": query})
+payload = {"queries": list(ground_truth), "top_k": TOP_K}
+if RERANK_DEPTH is not None:
+    payload["rerank_depth"] = RERANK_DEPTH
+
+response = requests.post(API_URL, json=payload, stream=True)
+response.raise_for_status()
+
+for i, line in enumerate(response.iter_lines(), start=1):
+    if not line:
+        continue
+    item = json.loads(line)
+    if "error" in item:
+        sys.exit(f"❌ Server failed on {item['query']!r}: {item['error']}")
+    true_urls = ground_truth[item["query"]]
     preds = {
         canonicalize_shl_url(r["url"])
-        for r in response.json()[:TOP_K]
+        for r in item["results"][:TOP_K]
     }
 
     hits = preds & true_urls
@@ -44,4 +61,7 @@ for i, (query, true_urls) in enumerate(ground_truth.items(), start=1):
 
     print(f"[{i}] Recall: {recall:.2f}")
 
+if len(recalls) != len(ground_truth):
+    sys.exit(f"❌ Stream ended after {len(recalls)} of {len(ground_truth)} queries")
+
 print(f"\n✅ FINAL Recall@{TOP_K}: {sum(recalls)/len(recalls):.4f}")
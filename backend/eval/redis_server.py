@@ -0,0 +1,125 @@
+import argparse
+import socketserver
+import threading
+import time
+
+
+class Store:
+    """The handful of Redis string commands the response cache uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self.data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl_ms=None):
+        expires_at = time.monotonic() + ttl_ms / 1000.0 if ttl_ms else None
+        with self.lock:
+            self.data[key] = (value, expires_at)
+
+    def delete(self, keys):
+        with self.lock:
+            return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def flush(self):
+        with self.lock:
+            self.data.clear()
+
+
+def bulk(value):
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def make_handler(store):
+    class Handler(socketserver.StreamRequestHandler):
+        def read_command(self):
+            # RESP arrays of bulk strings: *<n> then n x ($<len>, <bytes>)
+            line = self.rfile.readline()
+            if not line:
+                return None
+            if not line.startswith(b"*"):
+                return line.split()  # inline command (redis-cli, telnet)
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            return args
+
+        def handle(self):
+            while True:
+                args = self.read_command()
+                if args is None:
+                    return
+                if args:
+                    self.wfile.write(self.execute(args))
+
+        def execute(self, args):
+            command = args[0].upper()
+            if command == b"PING":
+                return b"+PONG\r\n"
+            if command == b"GET" and len(args) == 2:
+                return bulk(store.get(args[1]))
+            if command == b"SET" and len(args) >= 3:
+                options = [a.upper() for a in args[3:]]
+                ttl_ms = None
+                if b"PX" in options:
+                    ttl_ms = int(args[3 + options.index(b"PX") + 1])
+                elif b"EX" in options:
+                    ttl_ms = int(args[3 + options.index(b"EX") + 1]) * 1000
+                store.set(args[1], args[2], ttl_ms)
+                return b"+OK\r\n"
+            if command == b"DEL" and len(args) >= 2:
+                return b":%d\r\n" % store.delete(args[1:])
+            if command == b"FLUSHDB":
+                store.flush()
+                return b"+OK\r\n"
+            if command in (b"CLIENT", b"SELECT"):
+                # Connection setup sent by client libraries
+                return b"+OK\r\n"
+            return b"-ERR unknown command '%s'\r\n" % args[0]
+
+    return Handler
+
+
+class Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(port=6380):
+    """Start the stand-in on a background thread; returns (server, url)."""
+    server = Server(("127.0.0.1", port), make_handler(Store()))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"redis://127.0.0.1:{server.server_address[1]}/0"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local Redis-compatible stand-in for the shared response cache"
+    )
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+
+    server, url = serve(args.port)
+    print(f"🧪 Redis stand-in at {url}")
+    print(f"   SHL_RESPONSE_CACHE_REDIS={url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
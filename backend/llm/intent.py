@@ -0,0 +1,365 @@
+import asyncio
+import functools
+import inspect
+import json
+import os
+import re
+import urllib.request
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+from backend.metrics import INTENT_SOURCE, LLM_FAILURES, LLM_FALLBACKS
+
+INTENTS = ("technical", "behavioral", "mixed")
+
+# "routed" (rules, LLM only when unsure), "rules", "gemini" or "http"
+INTENT_PARSER = os.getenv("SHL_INTENT_PARSER", "routed")
+# LLM behind the router: "gemini", "http" or "none"
+INTENT_LLM = os.getenv("SHL_INTENT_LLM", "gemini")
+# Local stand-in for the LLM (python -m backend.eval.intent_server)
+INTENT_URL = os.getenv("SHL_INTENT_URL", "http://127.0.0.1:8766/parse")
+# Rule results at or above this confidence skip the LLM
+INTENT_CONFIDENCE = float(os.getenv("SHL_INTENT_CONFIDENCE", "0.75"))
+# Threads running sync LLM calls, so a timeout can abandon a slow one
+INTENT_WORKERS = int(os.getenv("SHL_INTENT_WORKERS", "8"))
+
+# Canonical skill -> query terms: words, two-word phrases, stems ("x*"), or
+# ambiguous words ("x?", e.g. "net revenue", "data-driven") that name a skill
+# but alone are never confident enough to skip the LLM
+TECHNICAL_SKILLS = {
+    "Java": ["java"],
+    "JavaScript": ["javascript", "js"],
+    "TypeScript": ["typescript"],
+    "Python": ["python"],
+    "SQL": ["sql", "database", "databases"],
+    "C++": ["c++"],
+    "C#": ["c#"],
+    ".NET": ["net?", "asp.net"],
+    "Selenium": ["selenium"],
+    "HTML/CSS": ["html", "html5", "css", "css3"],
+    "React": ["react"],
+    "Angular": ["angular"],
+    "Node.js": ["node?", "node.js"],
+    "Cloud": ["aws", "azure", "cloud"],
+    "Excel": ["excel"],
+    "Data analysis": ["data?", "analytics", "tableau", "power bi"],
+    "Machine learning": ["machine learning", "ml", "ai?"],
+    "Testing": ["testing?", "qa", "automation"],
+    "Programming": ["programm*", "coding", "developer?", "developers?", "software?"],
+    "Engineering": ["engineer", "engineers", "engineering", "devops", "linux"],
+}
+BEHAVIORAL_SKILLS = {
+    "communication": ["communicat*"],
+    "collaboration": ["collaborat*", "teamwork", "team work", "team player"],
+    "leadership": ["leader", "leaders", "leadership", "people management"],
+    "interpersonal": ["interpersonal", "stakeholder", "stakeholders", "relationship*"],
+    "personality": ["personality", "behavio*", "attitude", "culture"],
+    "customer service": ["customer service", "customer facing", "customer support",
+                         "client facing"],
+    "negotiation": ["negotiat*", "persua*"],
+    "adaptability": ["adaptab*", "resilien*"],
+}
+WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+# Distinct query words whose skill lookups are memoized
+WORD_CACHE_SIZE = 65536
+
+# Nearest-centroid fallback when no keyword matched: prototypes encoded with
+# the same model as the queries
+TECHNICAL_SEEDS = [
+    "software developer with programming skills",
+    "technical knowledge of programming languages, tools and frameworks",
+    "data analysis, databases and SQL",
+    "engineering and IT technical expertise",
+]
+BEHAVIORAL_SEEDS = [
+    "strong communication and interpersonal skills",
+    "teamwork, collaboration and leadership",
+    "personality, attitude and work style",
+    "customer service and people skills",
+]
+# Cosine margin between the two centroids worth 0.25 confidence
+CENTROID_SCALE = 0.0625
+# Keyword confidence when a kind is only named by ambiguous words; below
+# INTENT_CONFIDENCE so the router asks the LLM
+AMBIGUOUS_CONFIDENCE = 0.6
+
+
+def _vocabulary(technical, behavioral):
+    """
+    term -> (kind, skill, ambiguous) for whole words/phrases, and the same
+    for stems.
+    """
+    terms, stems = {}, {}
+    for kind, skills in (("technical", technical), ("behavioral", behavioral)):
+        for skill, words in skills.items():
+            for word in words:
+                if word.endswith("*"):
+                    stems[word[:-1]] = (kind, skill, False)
+                elif word.endswith("?"):
+                    terms[word[:-1]] = (kind, skill, True)
+                else:
+                    terms[word] = (kind, skill, False)
+    return terms, stems
+
+
+def result(technical, behavioral, intent, confidence, source):
+    return {
+        "technical_skills": technical,
+        "behavioral_skills": behavioral,
+        "intent": intent,
+        "confidence": round(float(confidence), 3),
+        "source": source,
+    }
+
+
+class IntentParser(ABC):
+    """
+    Maps a hiring query to {technical_skills, behavioral_skills, intent,
+    confidence, source}. `vector` is the query embedding, or a callable
+    returning it (awaitable in parse_async) so it is only waited for when
+    a parser needs it.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def parse(self, query, vector=None):
+        """The parse result for query (see the class docstring)."""
+
+    async def parse_async(self, query, vector=None):
+        return self.parse(query, vector)
+
+
+class RuleIntentParser(IntentParser):
+    """Keyword rules over skill names, then nearest centroid on the embedding."""
+
+    name = "rules"
+
+    def __init__(self, encode=None):
+        self.encode = encode
+        self.terms, self.stems = _vocabulary(TECHNICAL_SKILLS, BEHAVIORAL_SKILLS)
+        self.stem_lengths = sorted({len(stem) for stem in self.stems})
+        self.phrase_starts = {term.split()[0] for term in self.terms if " " in term}
+        self.lookup = functools.lru_cache(maxsize=WORD_CACHE_SIZE)(self._lookup)
+        self._centroids = None
+
+    def _lookup(self, word):
+        hits = [self.terms.get(word)]
+        hits += [self.stems.get(word[:n]) for n in self.stem_lengths if n < len(word)]
+        return tuple(hit for hit in hits if hit is not None)
+
+    def keywords(self, query):
+        """Skills named in the query: one tokenization, memoized lookups per word."""
+        found = {"technical": [], "behavioral": []}
+        certain = set()
+        words = WORD_RE.findall(query.lower())
+        for i, word in enumerate(words):
+            hits = self.lookup(word)
+            if word in self.phrase_starts and i + 1 < len(words):
+                phrase = self.terms.get(f"{word} {words[i + 1]}")
+                hits += (phrase,) if phrase else ()
+            for kind, skill, ambiguous in hits:
+                if skill not in found[kind]:
+                    found[kind].append(skill)
+                if not ambiguous:
+                    certain.add(kind)
+        technical, behavioral = found["technical"], found["behavioral"]
+        # A kind named only by ambiguous words leaves the intent to the LLM
+        unsure = any(found[kind] and kind not in certain for kind in found)
+
+        if technical and behavioral:
+            confidence = AMBIGUOUS_CONFIDENCE if unsure else 0.9
+            return result(technical, behavioral, "mixed", confidence, self.name)
+        if technical or behavioral:
+            hits = len(technical) + len(behavioral)
+            intent = "technical" if technical else "behavioral"
+            confidence = AMBIGUOUS_CONFIDENCE if unsure else 0.8 + 0.05 * min(hits, 3)
+            return result(technical, behavioral, intent, confidence, self.name)
+        return None
+
+    def centroids(self):
+        if self._centroids is None and self.encode is not None:
+            vectors = np.asarray(self.encode(TECHNICAL_SEEDS + BEHAVIORAL_SEEDS))
+            split = len(TECHNICAL_SEEDS)
+            centroids = np.stack([vectors[:split].mean(axis=0), vectors[split:].mean(axis=0)])
+            self._centroids = centroids / np.linalg.norm(centroids, axis=1, keepdims=True)
+        return self._centroids
+
+    def nearest_centroid(self, vector):
+        centroids = self.centroids()
+        if vector is None or centroids is None:
+            return result([], [], "mixed", 0.0, self.name)
+
+        technical, behavioral = centroids @ (vector / np.linalg.norm(vector))
+        margin = abs(technical - behavioral)
+        intent = "technical" if technical > behavioral else "behavioral"
+        # Close calls are "mixed" and never confident enough to skip the LLM
+        if margin < CENTROID_SCALE / 2:
+            intent = "mixed"
+        confidence = min(0.5 + 0.25 * margin / CENTROID_SCALE, 0.85)
+        return result([], [], intent, confidence, self.name)
+
+    def parse(self, query, vector=None):
+        found = self.keywords(query)
+        if found is not None:
+            return found
+        return self.nearest_centroid(vector() if callable(vector) else vector)
+
+    async def parse_async(self, query, vector=None):
+        found = self.keywords(query)
+        if found is not None:
+            return found
+        if callable(vector):
+            vector = vector()
+        if inspect.isawaitable(vector):
+            vector = await vector
+        return self.nearest_centroid(vector)
+
+
+class LLMIntentParser(IntentParser):
+    """Adapts parse functions (e.g. backend.llm.query_parser) to the interface."""
+
+    def __init__(self, parse, parse_async=None, name="llm"):
+        self._parse = parse
+        self._parse_async = parse_async
+        self.name = name
+
+    def _result(self, parsed):
+        intent = parsed.get("intent", "mixed")
+        return result(
+            parsed.get("technical_skills", []),
+            parsed.get("behavioral_skills", []),
+            intent if intent in INTENTS else "mixed",
+            1.0,
+            self.name,
+        )
+
+    def parse(self, query, vector=None):
+        return self._result(self._parse(query))
+
+    async def parse_async(self, query, vector=None):
+        if self._parse_async is None:
+            parsed = await asyncio.to_thread(self._parse, query)
+        else:
+            parsed = await self._parse_async(query)
+        return self._result(parsed)
+
+
+class HTTPIntentParser(LLMIntentParser):
+    """POSTs {"query": ...} to a local stand-in server; for tests and load runs."""
+
+    def __init__(self, url=INTENT_URL, timeout=5.0):
+        super().__init__(self._post, name="http")
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, query):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"query": query}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+
+def gemini_parser():
+    from backend.llm import query_parser
+    # Unparseable output raises, so the router falls back to the rule result
+    # instead of query_parser's fixed "technical" guess
+    return LLMIntentParser(
+        functools.partial(query_parser.parse_query, fallback=False),
+        functools.partial(query_parser.parse_query_async, fallback=False),
+        name="gemini",
+    )
+
+
+class RoutedIntentParser(IntentParser):
+    """
+    Rules first; the LLM is only called when their confidence is below
+    `threshold`. LLM errors and timeouts fall back to the rule result.
+    """
+
+    name = "routed"
+
+    def __init__(self, local, llm=None, threshold=INTENT_CONFIDENCE):
+        self.local = local
+        self.llm = llm
+        self.threshold = threshold
+        self._pool = ThreadPoolExecutor(INTENT_WORKERS, "shl-intent")
+
+    def _route(self, local):
+        if local["confidence"] >= self.threshold or self.llm is None:
+            INTENT_SOURCE.inc(source=local["source"])
+            return False
+        return True
+
+    def _fallback(self, local, reason):
+        LLM_FAILURES.inc(reason=reason)
+        LLM_FALLBACKS.inc(reason=reason)
+        INTENT_SOURCE.inc(source="fallback")
+        # The rule result, marked so callers know the LLM was wanted
+        return {**local, "source": "fallback"}
+
+    def parse(self, query, vector=None, timeout=None):
+        local = self.local.parse(query, vector)
+        if not self._route(local):
+            return local
+        try:
+            if timeout is None:
+                parsed = self.llm.parse(query)
+            else:
+                # A call past its timeout finishes on the pool, unawaited
+                parsed = self._pool.submit(self.llm.parse, query).result(timeout)
+        except FutureTimeoutError:
+            return self._fallback(local, "timeout")
+        except ValueError:
+            return self._fallback(local, "unparseable")
+        except Exception:
+            return self._fallback(local, "error")
+        INTENT_SOURCE.inc(source=parsed["source"])
+        return parsed
+
+    async def parse_async(self, query, vector=None, timeout=None):
+        local = await self.local.parse_async(query, vector)
+        if not self._route(local):
+            return local
+        try:
+            parsed = await asyncio.wait_for(self.llm.parse_async(query), timeout)
+        except asyncio.TimeoutError:
+            return self._fallback(local, "timeout")
+        except ValueError:
+            return self._fallback(local, "unparseable")
+        except Exception:
+            return self._fallback(local, "error")
+        INTENT_SOURCE.inc(source=parsed["source"])
+        return parsed
+
+
+def load_llm(backend=INTENT_LLM):
+    if backend == "gemini":
+        return gemini_parser()
+    if backend == "http":
+        return HTTPIntentParser()
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown intent LLM: {backend}")
+
+
+def load_intent_parser(backend=INTENT_PARSER, encode=None, llm=None):
+    """
+    The configured parser. `encode` (texts -> normalized vectors) enables
+    the nearest-centroid rule; `llm` overrides SHL_INTENT_LLM.
+    """
+    if backend == "rules":
+        return RoutedIntentParser(RuleIntentParser(encode), None)
+    if backend == "routed":
+        return RoutedIntentParser(RuleIntentParser(encode), llm or load_llm())
+    if backend in ("gemini", "http"):
+        # Always ask the LLM; rules only cover its failures
+        return RoutedIntentParser(RuleIntentParser(encode), llm or load_llm(backend),
+                                  threshold=float("inf"))
+    raise ValueError(f"Unknown intent parser: {backend}")
@@ -1,20 +1,117 @@
-import google.generativeai as genai
 import os
 import json
+import re
+import threading
 
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise RuntimeError("GOOGLE_API_KEY not set")
+from backend.cache import LRUCache, SQLiteStore, TieredCache
+from backend.metrics import LLM_FALLBACKS
 
-genai.configure(api_key=api_key)
+# ✅ USE THE ONLY WORKING MODEL
+GEMINI_MODEL = "models/gemini-2.5-flash"
 
+# Parsed intents are cached on normalized query text
+PARSE_CACHE_SIZE = int(os.getenv("SHL_PARSE_CACHE_SIZE", "1024"))
+PARSE_CACHE_TTL = float(os.getenv("SHL_PARSE_CACHE_TTL", "86400"))
+PARSE_CACHE_DB = os.getenv("SHL_PARSE_CACHE_DB")  # optional SQLite path
 
-# ✅ USE THE ONLY WORKING MODEL
-model = genai.GenerativeModel("models/gemini-2.5-flash")
-import re
+FALLBACK = {
+    "technical_skills": [],
+    "behavioral_skills": [],
+    "intent": "technical"
+}
+
+
+def _make_cache():
+    store = None
+    if PARSE_CACHE_DB:
+        store = SQLiteStore(PARSE_CACHE_DB, ttl=PARSE_CACHE_TTL, table="query_parse")
+    return TieredCache(
+        LRUCache(max_entries=PARSE_CACHE_SIZE, ttl=PARSE_CACHE_TTL),
+        store=store,
+        dumps=lambda value: json.dumps(value).encode("utf-8"),
+        loads=lambda raw: json.loads(bytes(raw).decode("utf-8")),
+    )
+
+
+_cache = _make_cache()
+
+# Created on first use, so importing this module needs neither the SDK
+# configured nor GOOGLE_API_KEY set
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                api_key = os.getenv("GOOGLE_API_KEY")
+                if not api_key:
+                    raise RuntimeError("GOOGLE_API_KEY not set")
+
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                _model = genai.GenerativeModel(GEMINI_MODEL)
+    return _model
+
+
+def normalize_query(query: str):
+    return " ".join(query.lower().split())
+
+
+def cache_stats():
+    return _cache.stats()
 
-def parse_query(query: str):
-    prompt = f"""
+
+def cache_key(query: str, llm=None):
+    """
+    Normalized query under the model that parses it. An explicitly passed
+    model (e.g. a test stub) is keyed on its own identity, so its results
+    are never served for the configured Gemini model or vice versa.
+    """
+    model = GEMINI_MODEL
+    if llm is not None:
+        model = (f"{type(llm).__module__}.{type(llm).__qualname__}"
+                 f":{getattr(llm, 'model_name', '')}:{id(llm)}")
+    return f"{model}\0{normalize_query(query)}"
+
+
+def parse_query(query: str, llm=None, fallback=True):
+    """
+    Parse a hiring query, reusing cached results for repeated queries.
+    Unparseable output returns FALLBACK, or raises ValueError with
+    fallback=False so the caller can apply its own.
+    """
+    try:
+        result = _cache.get_or_compute(
+            cache_key(query, llm), lambda: _parse_uncached(query, llm or get_model())
+        )
+    except ValueError:
+        if not fallback:
+            raise
+        LLM_FALLBACKS.inc(reason="unparseable")
+        return dict(FALLBACK)
+    return dict(result)
+
+
+async def parse_query_async(query: str, llm=None, fallback=True):
+    """Non-blocking parse_query using the Gemini async client."""
+    try:
+        result = await _cache.aget_or_compute(
+            cache_key(query, llm),
+            lambda: _parse_uncached_async(query, llm or get_model()),
+        )
+    except ValueError:
+        if not fallback:
+            raise
+        LLM_FALLBACKS.inc(reason="unparseable")
+        return dict(FALLBACK)
+    return dict(result)
+
+
+def _build_prompt(query: str):
+    return f"""
 You are an expert HR analyst.
 
 Given a hiring query, you MUST extract:
@@ -41,22 +138,37 @@ Query:
 "{query}"
 """
 
-    response = model.generate_content(
-        prompt,
+
+def _parse_uncached(query: str, llm):
+    response = llm.generate_content(
+        _build_prompt(query),
+        generation_config={"temperature": 0}
+    )
+    return _parse_response(response.text)
+
+
+async def _parse_uncached_async(query: str, llm):
+    response = await llm.generate_content_async(
+        _build_prompt(query),
         generation_config={"temperature": 0}
     )
+    return _parse_response(response.text)
 
-    text = response.text.strip()
+
+def _parse_response(text: str):
+    text = text.strip()
 
     # ✅ REMOVE ```json ``` wrappers if present
     text = re.sub(r"^```json\s*|\s*```$", "", text, flags=re.DOTALL).strip()
 
     try:
-        return json.loads(text)
+        parsed = json.loads(text)
     except Exception as e:
+        # Raised so the fallback is returned but never cached
         print("⚠️ JSON parsing failed. Raw LLM output:\n", text)
-        return {
-            "technical_skills": [],
-            "behavioral_skills": [],
-            "intent": "technical"
-        }
+        raise ValueError("Unparseable LLM output") from e
+
+    if not isinstance(parsed, dict):
+        print("⚠️ LLM output is not a JSON object:\n", text)
+        raise ValueError("LLM output is not a JSON object")
+    return parsed
@@ -0,0 +1,207 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond FAISS searches up to slow model loads
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        return self._values.get(key, 0)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if i < len(self.buckets):
+                series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    labels = _format_labels(self.labels, key, [("le", bound)])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labels, key, [("le", "+Inf")])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+
+                labels = _format_labels(self.labels, key)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Process-local metrics rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """collect() returns extra exposition lines, evaluated on each scrape."""
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        for collect in self._collectors:
+            lines.extend(collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+LOAD_SECONDS = REGISTRY.histogram(
+    "shl_load_seconds", "Time spent loading model, index and catalog", ["phase"]
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "shl_stage_seconds", "Per-request time spent in each pipeline stage", ["stage"]
+)
+LLM_FAILURES = REGISTRY.counter(
+    "shl_llm_failures_total", "Intent LLM calls that raised or timed out", ["reason"]
+)
+LLM_FALLBACKS = REGISTRY.counter(
+    "shl_llm_fallbacks_total", "Requests served with a fallback intent", ["reason"]
+)
+INTENT_SOURCE = REGISTRY.counter(
+    "shl_intent_source_total",
+    "Which parser resolved each query's intent (rules, an LLM, or fallback)",
+    ["source"],
+)
+CANDIDATE_POOL_EXHAUSTED = REGISTRY.counter(
+    "shl_candidate_pool_exhausted_total",
+    "Requests where the catalog could not fill an intent bucket",
+    ["bucket"],
+)
+
+FILTERS_RELAXED = REGISTRY.counter(
+    "shl_filters_relaxed_total",
+    "Searches where query filters left too few items and were dropped",
+    ["bucket"],
+)
+LONG_QUERIES = REGISTRY.counter(
+    "shl_long_queries_total",
+    "Queries encoded as sentence windows; capped = windows were dropped",
+    ["capped"],
+)
+RERANK_FALLBACKS = REGISTRY.counter(
+    "shl_rerank_fallbacks_total",
+    "Requests served in first-stage order instead of reranked",
+    ["reason"],
+)
+SNAPSHOT_RELOADS = REGISTRY.counter(
+    "shl_snapshot_reloads_total", "Index snapshot reload attempts", ["result"]
+)
+
+
+def cache_lines(caches):
+    """Exposition lines for {cache_name: stats()} of LRU / tiered caches."""
+    samples = {"hits": [], "misses": [], "evictions": [], "entries": [], "bytes": []}
+
+    def add(cache, tier, stats):
+        for field in samples:
+            if field in stats:
+                samples[field].append((cache, tier, stats[field]))
+
+    for cache, stats in caches.items():
+        add(cache, "memory", stats.get("memory", {}))
+        add(cache, "store", stats.get("store", {}))
+
+    lines = []
+    for field, rows in samples.items():
+        if not rows:
+            continue
+        kind = "gauge" if field in ("entries", "bytes") else "counter"
+        name = f"shl_cache_{field}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# TYPE {name} {kind}")
+        for cache, tier, value in rows:
+            lines.append(f'{name}{{cache="{cache}",tier="{tier}"}} {value}')
+    return lines
+
+
+@contextmanager
+def stage(timings, name, observe=True):
+    """
+    Time a pipeline stage into the histogram and, if given, `timings` (s).
+    observe=False only fills `timings`, for work shared by several requests
+    that each observe it themselves.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if observe:
+            STAGE_SECONDS.observe(elapsed, stage=name)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def server_timing(timings):
+    """Format stage timings as a Server-Timing header value (milliseconds)."""
+    return ", ".join(
+        f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()
+    )
@@ -0,0 +1,68 @@
+import re
+
+import numpy as np
+
+# Sentence ends, or line breaks between bullet points
+SENTENCE_BREAK_RE = re.compile(r"(?<=[.!?;])\s+|\s*\n+\s*")
+
+AGGREGATIONS = ("max", "mean")
+
+
+def split_sentences(text):
+    return [s for s in (s.strip() for s in SENTENCE_BREAK_RE.split(text)) if s]
+
+
+def split_query(text, long_words, chunk_words):
+    """
+    [text] for short queries. Longer ones (more than long_words words) are
+    packed sentence by sentence into windows of at most chunk_words words.
+    """
+    if long_words <= 0 or len(text.split()) <= long_words:
+        return [text]
+
+    windows, current = [], []
+    for sentence in split_sentences(text):
+        words = sentence.split()
+        # One run-on "sentence" longer than a window is cut by word count
+        for start in range(0, len(words), chunk_words):
+            piece = words[start:start + chunk_words]
+            if current and len(current) + len(piece) > chunk_words:
+                windows.append(" ".join(current))
+                current = []
+            current.extend(piece)
+    if current:
+        windows.append(" ".join(current))
+    return windows
+
+
+def spread(windows, max_chunks):
+    """At most max_chunks windows, evenly spaced so the whole text is covered."""
+    if len(windows) <= max_chunks:
+        return windows
+    keep = np.unique(np.linspace(0, len(windows) - 1, max_chunks).round().astype(int))
+    return [windows[i] for i in keep]
+
+
+def aggregate(scores, indices, how="max"):
+    """
+    Merge the per-chunk rows of one FAISS search (inner-product scores,
+    -1 = no result) into one ranking. "max" keeps each item's best chunk
+    score; "mean" averages over all chunks, counting 0 for chunks whose
+    top k missed the item, so items matching many chunks rise.
+    """
+    if how not in AGGREGATIONS:
+        raise ValueError(f"Unknown chunk aggregation: {how}")
+
+    found = indices >= 0
+    ids, inverse = np.unique(indices[found], return_inverse=True)
+    values = scores[found]
+
+    if how == "max":
+        merged = np.full(len(ids), -np.inf, dtype="float32")
+        np.maximum.at(merged, inverse, values)
+    else:
+        merged = np.zeros(len(ids), dtype="float32")
+        np.add.at(merged, inverse, values)
+        merged /= len(indices)
+
+    return ids[np.argsort(-merged, kind="stable")]
@@ -0,0 +1,115 @@
+import os
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# "torch" (SentenceTransformer) or "onnx" (onnxruntime, no torch import)
+EMBED_BACKEND = os.getenv("SHL_EMBED_BACKEND", "torch")
+ONNX_MODEL_DIR = Path(os.getenv("SHL_ONNX_MODEL_DIR", BASE_DIR / "vector_db" / "onnx"))
+# Use the int8 dynamically-quantized export instead of the fp32 one
+ONNX_QUANTIZED = os.getenv("SHL_ONNX_QUANTIZED", "0") == "1"
+
+ONNX_FILES = {False: "model.onnx", True: "model_int8.onnx"}
+# all-MiniLM-L6-v2 truncates at 256 word pieces
+MAX_SEQ_LENGTH = 256
+
+
+class SentenceTransformerEmbedder:
+    """The reference backend; build_index.py encodes the catalog with it."""
+
+    def __init__(self, model_name=MODEL_NAME, num_threads=0):
+        from sentence_transformers import SentenceTransformer
+        if num_threads:
+            import torch
+            torch.set_num_threads(num_threads)
+
+        self.name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts):
+        vectors = self.model.encode(
+            texts, batch_size=len(texts)
+        ).astype("float32")
+        faiss.normalize_L2(vectors)
+        return vectors
+
+
+class OnnxEmbedder:
+    """
+    The same MiniLM exported to ONNX (see backend.vector_db.export_onnx),
+    run through onnxruntime with a Rust `tokenizers` tokenizer.
+    """
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, quantized=ONNX_QUANTIZED,
+                 num_threads=0):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The onnx backend needs the optional packages in requirements-onnx.txt"
+            ) from e
+
+        model_dir = Path(model_dir)
+        model_path = model_dir / ONNX_FILES[quantized]
+        if not model_path.exists():
+            raise FileNotFoundError(
+                f"{model_path} not found; run python -m backend.vector_db.export_onnx"
+            )
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        # Quantized vectors differ slightly, so they get their own cache keys
+        self.name = embedder_name("onnx", quantized)
+
+    def encode(self, texts):
+        encodings = self.tokenizer.encode_batch(list(texts))
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype="int64"),
+            "attention_mask": np.array(
+                [e.attention_mask for e in encodings], dtype="int64"
+            ),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype="int64"),
+        }
+        feeds = {name: value for name, value in feeds.items() if name in self.input_names}
+
+        token_vectors = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, as SentenceTransformer does
+        mask = feeds["attention_mask"][:, :, None].astype("float32")
+        summed = (token_vectors * mask).sum(axis=1)
+        vectors = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        faiss.normalize_L2(vectors)
+        return vectors
+
+
+def load_embedder(backend=EMBED_BACKEND, num_threads=0):
+    if backend == "torch":
+        return SentenceTransformerEmbedder(num_threads=num_threads)
+    if backend == "onnx":
+        return OnnxEmbedder(num_threads=num_threads)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def embedder_name(backend=EMBED_BACKEND, quantized=ONNX_QUANTIZED):
+    """Cache namespace of a backend, known before the model is loaded."""
+    if backend == "onnx":
+        return f"{MODEL_NAME}-onnx{'-int8' if quantized else ''}"
+    return MODEL_NAME
@@ -0,0 +1,87 @@
+import hashlib
+import os
+
+import numpy as np
+
+from backend.cache import LRUCache, SQLiteStore
+
+# In-process budget for cached query vectors (384 float32 = 1.5KB each)
+EMBED_CACHE_BYTES = int(os.getenv("SHL_EMBED_CACHE_BYTES", str(32 * 1024 * 1024)))
+EMBED_CACHE_DB = os.getenv("SHL_EMBED_CACHE_DB")  # optional shared SQLite tier
+
+
+def normalize_text(text: str):
+    # all-MiniLM-L6-v2 lowercases and splits on whitespace, so these
+    # variants produce identical embeddings
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """Content-hashed cache of normalized query vectors in front of model.encode."""
+
+    def __init__(self, model_name, max_bytes=EMBED_CACHE_BYTES, db_path=EMBED_CACHE_DB):
+        self.model_name = model_name
+        self.memory = LRUCache(
+            max_entries=1 << 30, max_bytes=max_bytes, sizeof=lambda v: v.nbytes
+        )
+        self.store = None
+        if db_path:
+            self.store = SQLiteStore(db_path, table="query_embeddings")
+        self.encoded = 0
+
+    def key(self, text: str):
+        payload = f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, text: str):
+        return self._get(self.key(text))
+
+    def put(self, text: str, vector):
+        self._put(self.key(text), vector)
+
+    def _get(self, key):
+        vector = self.memory.get(key)
+        if vector is not None or self.store is None:
+            return vector
+
+        raw = self.store.get(key)
+        if raw is None:
+            return None
+
+        vector = np.frombuffer(bytes(raw), dtype="float32")
+        self.memory.set(key, vector)
+        return vector
+
+    def _put(self, key, vector):
+        vector = np.array(vector, dtype="float32")
+        vector.flags.writeable = False
+        self.memory.set(key, vector)
+        if self.store is not None:
+            self.store.set(key, vector.tobytes())
+        return vector
+
+    def encode(self, texts, encode_fn):
+        """Return vectors for texts, calling encode_fn once for the unique misses."""
+        keys = [self.key(t) for t in texts]
+        vectors = [self._get(k) for k in keys]
+
+        misses = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                misses.setdefault(keys[i], []).append(i)
+
+        if misses:
+            encoded = encode_fn([texts[rows[0]] for rows in misses.values()])
+            self.encoded += len(misses)
+            for (key, rows), vector in zip(misses.items(), encoded):
+                vector = self._put(key, vector)
+                for i in rows:
+                    vectors[i] = vector
+
+        return np.ascontiguousarray(np.stack(vectors), dtype="float32")
+
+    def stats(self):
+        stats = {"memory": self.memory.stats(), "encoded": self.encoded}
+        if self.store is not None:
+            stats["store"] = self.store.stats()
+        return stats
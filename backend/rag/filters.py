@@ -0,0 +1,175 @@
+import re
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from backend.vector_db.catalog import JOB_LEVEL_BITS
+
+# "60 minutes", "30 min", "1 hour", "1-2 hour", "1.5 hrs"
+DURATION_RE = re.compile(
+    r"(?:(\d+(?:\.\d+)?)\s*(?:-|to)\s*)?(\d+(?:\.\d+)?)\s*"
+    r"(hours?|hrs?|minutes?|mins?)\b",
+    re.IGNORECASE,
+)
+# "an hour", "half an hour", "one hour"
+WORD_DURATION_RE = re.compile(r"\b(half an|an|one)\s+hour\b", re.IGNORECASE)
+# A duration is a time budget only when worded as one near the number:
+# "completed in 40 minutes", "30-40 mins long", "max duration of 60 minutes"
+DURATION_CONTEXT_RE = re.compile(
+    r"\b(?:duration|time limit|test\w*|asses+\w*|exam\w*|max\w*|at most|within"
+    r"|complet\w*|long|budget|(?:less|shorter) than|under|up ?to)\b",
+    re.IGNORECASE,
+)
+# Lower bounds right before the number ("at least 30 minutes", "more than
+# 45 minutes") are not a max_duration; "no more than" / "not be more than"
+# still are
+MIN_DURATION_RE = re.compile(
+    r"(?:\bat ?least|\bminimum(?: of)?|\bover|\bexceed\w*|\bupwards of"
+    r"|(?<!\bno )(?<!\bnot )(?<!\bnot be )\b(?:more|longer) than)"
+    r"\s+(?:about\s+|around\s+|approx\w*\s+)?$",
+    re.IGNORECASE,
+)
+# Characters either side of a duration searched for that wording
+DURATION_CONTEXT_CHARS = 40
+# Work patterns, not budgets: "8 hours per day", "40 hours a week"
+PER_PERIOD_RE = re.compile(
+    r"\s*(?:per|a|an|each|every|/)\s*(?:day|week|month|year|shift)\b",
+    re.IGNORECASE,
+)
+SENTENCE_BREAK_RE = re.compile(r"[!?\n]|\.(?!\d)")
+REMOTE_RE = re.compile(
+    r"\bremote(?:ly)?\s+(?:test\w*|proctor\w*|administ\w*|assess\w*)"
+    r"|\b(?:taken|completed|done)\s+remotely\b",
+    re.IGNORECASE,
+)
+# Assessment wording only: "adaptive, resilient team player" is a soft skill
+ADAPTIVE_RE = re.compile(
+    r"\badaptive\s+(?:test\w*|assess\w*|exam\w*)"
+    r"|\bcomputer(?:ized|ised)?[- ]adaptive\b|\bIRT\b|\bitem response theory\b",
+    re.IGNORECASE,
+)
+
+# Seniority -> SHL job levels it admits; "General Population" items fit all
+SENIORITY_LEVELS = {
+    "entry": ["Entry-Level", "Graduate"],
+    "mid": ["Mid-Professional", "Professional Individual Contributor"],
+    "senior": ["Mid-Professional", "Professional Individual Contributor", "Manager"],
+    "manager": ["Front Line Manager", "Supervisor", "Manager"],
+    "executive": ["Director", "Executive"],
+}
+SENIORITY_PATTERNS = {
+    "entry": r"\bentry[- ]level\b|\bgraduates?\b|\bfreshers?\b|\bjunior\b|\binterns?\b",
+    "mid": r"\bmid[- ]?(?:level|professional|senior)\b|\bintermediate\b",
+    "senior": r"\bsenior\b|\bexperienced\b",
+    "manager": r"\bmanagers?\b|\bteam leads?\b|\bsupervisors?\b",
+    "executive": r"\bdirectors?\b|\bc-suite\b|\b(?:coo|ceo|cfo|cto|cxo|vp)\b|\bhead of\b",
+}
+SENIORITY_RE = {
+    seniority: re.compile(pattern, re.IGNORECASE)
+    for seniority, pattern in SENIORITY_PATTERNS.items()
+}
+# The role is stated up front; full job descriptions mention "manager",
+# "senior" etc. later for reporting lines and teams. Years of experience are
+# not scoped: they sit in the Requirements section and describe the role.
+SENIORITY_SCAN_CHARS = 300
+
+# "0-2 years of experience", "5+ years experience", "Experience required 0-2 years"
+EXPERIENCE_RE = re.compile(
+    r"(\d+)\s*(?:\+|(?:-|to)\s*\d+)?\s*years?\s*(?:of\s+)?(?:(?:relevant|work|professional)\s+)?(?:experience|exp)\b"
+    r"|\bexperience(?:\s+required)?\s*(?:of|:)?\s*(\d+)\s*(?:\+|(?:-|to)\s*\d+)?\s*years?",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """Structured constraints applied inside the vector search."""
+
+    max_duration: Optional[int] = None   # minutes
+    remote: Optional[bool] = None
+    adaptive: Optional[bool] = None
+    job_levels: int = 0                  # JOB_LEVEL_BITS mask, 0 = any
+
+    def is_empty(self):
+        return self == NO_FILTERS
+
+    def relaxations(self):
+        """Progressively looser filter sets: seniority (the noisiest) goes first."""
+        steps = []
+        if self.job_levels:
+            steps.append(replace(self, job_levels=0))
+        steps.append(NO_FILTERS)
+        return [step for step in dict.fromkeys(steps) if step != self]
+
+
+NO_FILTERS = SearchFilters()
+
+
+def _is_budget(query: str, match):
+    """True when a duration is worded as an assessment limit in its sentence."""
+    if PER_PERIOD_RE.match(query, match.end()):
+        return False
+    start, end = match.span()
+    before = SENTENCE_BREAK_RE.split(query[max(0, start - DURATION_CONTEXT_CHARS):start])[-1]
+    if MIN_DURATION_RE.search(before):
+        return False
+    after = SENTENCE_BREAK_RE.split(query[end:end + DURATION_CONTEXT_CHARS], 1)[0]
+    return bool(DURATION_CONTEXT_RE.search(before) or DURATION_CONTEXT_RE.search(after))
+
+
+def extract_max_duration(query: str):
+    """Largest assessment time budget mentioned in the query, in minutes."""
+    limits = []
+
+    for match in DURATION_RE.finditer(query):
+        if not _is_budget(query, match):
+            continue
+        value = float(match.group(2))
+        if match.group(3).lower().startswith(("h", "hr")):
+            value *= 60
+        limits.append(value)
+
+    for match in WORD_DURATION_RE.finditer(query):
+        if _is_budget(query, match):
+            limits.append(30 if match.group(1).lower() == "half an" else 60)
+
+    return int(max(limits)) if limits else None
+
+
+def extract_seniority(query: str):
+    """
+    Seniority buckets named at the start of the query, or implied by years
+    of experience anywhere in it.
+    """
+    found = {
+        seniority
+        for seniority, pattern in SENIORITY_RE.items()
+        if pattern.search(query[:SENIORITY_SCAN_CHARS])
+    }
+
+    for match in EXPERIENCE_RE.finditer(query):
+        years = int(match.group(1) or match.group(2))
+        found.add("entry" if years < 2 else "mid" if years < 5 else "senior")
+
+    return found
+
+
+def extract_job_levels(query: str):
+    """Job level mask admitted by the query's seniority (0 = no constraint)."""
+    found = extract_seniority(query)
+    if not found:
+        return 0
+
+    mask = JOB_LEVEL_BITS["General Population"]
+    for seniority in found:
+        for level in SENIORITY_LEVELS[seniority]:
+            mask |= JOB_LEVEL_BITS[level]
+    return mask
+
+
+def extract_filters(query: str):
+    return SearchFilters(
+        max_duration=extract_max_duration(query),
+        remote=True if REMOTE_RE.search(query) else None,
+        adaptive=True if ADAPTIVE_RE.search(query) else None,
+        job_levels=extract_job_levels(query),
+    )
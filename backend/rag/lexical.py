@@ -0,0 +1,178 @@
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+LEXICAL_FORMAT = 1
+
+# Okapi BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Name terms count this many times: exact skill names ("Java", "SQL") live there
+NAME_BOOST = 2
+
+# Keeps "c++", "c#", "node.js" and ".net" (-> "net") intact
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by can for from has have i in is it of on or "
+    "our that the their this to was we who will with you your".split()
+)
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(str(text).lower()) if t not in STOPWORDS]
+
+
+def document_terms(record):
+    """Indexed terms of one catalog record (empty for deleted ids)."""
+    name = record.get("name")
+    description = record.get("description")
+    terms = []
+    if isinstance(name, str):
+        terms += tokenize(name) * NAME_BOOST
+    if isinstance(description, str):
+        terms += tokenize(description)
+    return terms
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over catalog rows, array-backed: postings of term t
+    are postings[offsets[t]:offsets[t + 1]] with precomputed BM25 weights,
+    so a query is a handful of vectorized adds into one score array.
+    """
+
+    def __init__(self, vocab, offsets, postings, weights, count):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.postings = postings
+        self.weights = weights
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    # -------------------------------------------------
+    # BUILD / SAVE / LOAD
+    # -------------------------------------------------
+    @classmethod
+    def from_records(cls, records, k1=K1, b=B):
+        vocab = {}
+        doc_terms = []
+        for record in records:
+            counts = {}
+            for term in document_terms(record):
+                counts[term] = counts.get(term, 0) + 1
+            doc_terms.append(counts)
+            for term in counts:
+                vocab.setdefault(term, len(vocab))
+
+        n = len(records)
+        lengths = np.array([sum(c.values()) for c in doc_terms], dtype="float32")
+        avgdl = float(lengths[lengths > 0].mean()) if lengths.any() else 1.0
+
+        term_ids, doc_ids, tfs = [], [], []
+        for doc, counts in enumerate(doc_terms):
+            for term, tf in counts.items():
+                term_ids.append(vocab[term])
+                doc_ids.append(doc)
+                tfs.append(tf)
+
+        term_ids = np.array(term_ids, dtype="int64")
+        doc_ids = np.array(doc_ids, dtype="int32")
+        tfs = np.array(tfs, dtype="float32")
+
+        df = np.bincount(term_ids, minlength=len(vocab)).astype("float32")
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        norm = k1 * (1 - b + b * lengths[doc_ids] / avgdl)
+        weights = idf[term_ids] * tfs * (k1 + 1) / (tfs + norm)
+
+        # Stable sort keeps each posting list in doc order
+        order = np.argsort(term_ids, kind="stable")
+        offsets = np.zeros(len(vocab) + 1, dtype="int64")
+        offsets[1:] = np.cumsum(df.astype("int64"))
+
+        return cls(
+            vocab,
+            offsets,
+            doc_ids[order],
+            weights[order].astype("float32"),
+            n,
+        )
+
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        np.save(path / "offsets.npy", self.offsets)
+        np.save(path / "postings.npy", self.postings)
+        np.save(path / "weights.npy", self.weights)
+
+        terms = sorted(self.vocab, key=self.vocab.get)
+        manifest = {"format": LEXICAL_FORMAT, "count": self.count, "terms": terms}
+        with open(path / "lexical.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        path = Path(path)
+        mode = "r" if mmap else None
+
+        with open(path / "lexical.json", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != LEXICAL_FORMAT:
+            raise ValueError(f"Unsupported lexical format: {manifest.get('format')}")
+
+        vocab = {term: i for i, term in enumerate(manifest["terms"])}
+        return cls(
+            vocab,
+            np.load(path / "offsets.npy", mmap_mode=mode),
+            np.load(path / "postings.npy", mmap_mode=mode),
+            np.load(path / "weights.npy", mmap_mode=mode),
+            manifest["count"],
+        )
+
+    # -------------------------------------------------
+    # SEARCH
+    # -------------------------------------------------
+    def scores(self, query):
+        """BM25 score of every row, or None when no query term is indexed."""
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids:
+            return None
+
+        scores = np.zeros(self.count, dtype="float32")
+        for t in term_ids:
+            start, end = self.offsets[t], self.offsets[t + 1]
+            # Doc ids are unique within a posting list, so fancy-index add is exact
+            scores[self.postings[start:end]] += self.weights[start:end]
+        return scores
+
+    @staticmethod
+    def top(scores, k, mask=None):
+        """Best k rows with a positive score, restricted to mask."""
+        hits = scores > 0
+        if mask is not None:
+            hits &= mask
+        candidates = np.flatnonzero(hits)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def reciprocal_rank_fusion(rankings, weights, k=60):
+    """
+    Fuse ranked id arrays: score(d) = sum of weight / (k + rank). Ties keep
+    the order in which ids were first seen, so the first ranking wins them.
+    """
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        if weight <= 0:
+            continue
+        for rank, doc in enumerate(ranking.tolist(), start=1):
+            fused[doc] = fused.get(doc, 0.0) + weight / (k + rank)
+
+    ordered = sorted(fused, key=fused.get, reverse=True)
+    return np.array(ordered, dtype="int64")
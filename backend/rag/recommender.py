@@ -1,104 +1,1051 @@
+import asyncio
 import faiss
-import pickle
-from pathlib import Path
+import numpy as np
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+
+from backend.metrics import (
+    CANDIDATE_POOL_EXHAUSTED,
+    FILTERS_RELAXED,
+    LOAD_SECONDS,
+    LONG_QUERIES,
+    RERANK_FALLBACKS,
+    SNAPSHOT_RELOADS,
+    STAGE_SECONDS,
+    stage,
+)
+from backend.rag import chunking
+from backend.rag.embedders import embedder_name, load_embedder
+from backend.rag.embedding_cache import EmbeddingCache
+from backend.rag.filters import NO_FILTERS, extract_filters
+from backend.rag.lexical import LexicalIndex, reciprocal_rank_fusion
+from backend.rag.reranker import CrossEncoderReranker, rerank_order
+from backend.vector_db import index_types, snapshots
+from backend.vector_db.catalog import BEHAVIORAL_BITS, TECHNICAL_BITS, Catalog
+
+# Queries arriving within this window are encoded together (0 disables batching)
+BATCH_WINDOW_MS = float(os.getenv("SHL_BATCH_WINDOW_MS", "5"))
+MAX_BATCH_SIZE = int(os.getenv("SHL_MAX_BATCH_SIZE", "32"))
+
+# Memory-map the FAISS index read-only so worker processes share its pages
+INDEX_MMAP = os.getenv("SHL_INDEX_MMAP", "0") == "1"
+# Per-process torch/FAISS thread budget (set by backend.serve)
+NUM_THREADS = int(os.getenv("SHL_NUM_THREADS", "0"))
+
+# Intent buckets searched directly through FAISS ID selectors:
+# bucket -> (any of these type bits, none of these)
+BUCKETS = {
+    "technical": (TECHNICAL_BITS, 0),
+    "behavioral": (BEHAVIORAL_BITS, TECHNICAL_BITS),
+}
+# Pull duration / remote / adaptive constraints out of the query text
+QUERY_FILTERS = os.getenv("SHL_QUERY_FILTERS", "1") == "1"
+MAX_CACHED_SELECTORS = 256
+
+# Hybrid retrieval: BM25 over names/descriptions fused with the dense
+# ranking by weighted reciprocal-rank fusion (lexical weight 0 = dense only).
+# Off until Recall@K on the real models shows a gain: compare with
+# `benchmark --lexical-weight 0` vs `--lexical-weight 1` on a snapshot that
+# has a lexical index
+DENSE_WEIGHT = float(os.getenv("SHL_DENSE_WEIGHT", "1.0"))
+LEXICAL_WEIGHT = float(os.getenv("SHL_LEXICAL_WEIGHT", "0"))
+RRF_K = int(os.getenv("SHL_RRF_K", "60"))
+
+# Full job descriptions would be truncated at MiniLM's 256 tokens (after
+# tokenizing all of them): queries over LONG_QUERY_WORDS words are split into
+# sentence windows, encoded in one batch and searched in one multi-row call,
+# with per-item scores aggregated over windows ("max" or "mean"). Opt-in
+# (0 = whole-query encoding) until Recall@K on the real model is compared:
+# `benchmark --long-query-words 0` vs e.g. `--long-query-words 160`
+LONG_QUERY_WORDS = int(os.getenv("SHL_LONG_QUERY_WORDS", "0"))
+CHUNK_WORDS = int(os.getenv("SHL_CHUNK_WORDS", "96"))
+MAX_QUERY_CHUNKS = int(os.getenv("SHL_MAX_QUERY_CHUNKS", "8"))
+CHUNK_AGGREGATION = os.getenv("SHL_CHUNK_AGGREGATION", "max")
+
+# Optional cross-encoder pass over the top RERANK_DEPTH candidates of each
+# bucket (0 = off; endpoints pass their own depth). Requests that have spent
+# RERANK_BUDGET_MS by the time scores are due keep the first-stage order
+RERANK_DEPTH = int(os.getenv("SHL_RERANK_DEPTH", "0"))
+RERANK_BUDGET_MS = float(os.getenv("SHL_RERANK_BUDGET_MS", "150"))
+RERANK_WORKERS = int(os.getenv("SHL_RERANK_WORKERS", "2"))
+
+# How often the watcher thread checks for a newer published snapshot (0 = never)
+RELOAD_CHECK_S = float(os.getenv("SHL_RELOAD_CHECK_S", "5"))
+
+# The intent LLM gives up after this long; the rule-based guess is used instead
+LLM_TIMEOUT = float(os.getenv("SHL_LLM_TIMEOUT", "3"))
+
+
+class QueryBatcher:
+    """
+    Collects concurrent queries and runs them through one encode call and
+    search_fn(vectors, requests), which returns one result per row.
+    """
+
+    def __init__(self, encode_fn, search_fn, window_ms=BATCH_WINDOW_MS,
+                 max_batch_size=MAX_BATCH_SIZE):
+        self.encode_fn = encode_fn
+        self.search_fn = search_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, query: str, request) -> Future:
+        """Queue a query; resolves to (vector, search result, batch timings)."""
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((query, request, future))
+        return future
+
+    def search(self, query: str, request):
+        return self.submit(query, request).result()
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="shl-query-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                deadline = time.perf_counter() + self.window
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+
+                self._process(batch)
+            except Exception as e:
+                # Fail this batch but keep the worker alive: a dead worker
+                # would leave every later caller waiting forever
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch):
+        batch = [b for b in batch if b[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            self._complete(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+                return
+            # Run each request on its own so a bad one only fails itself
+            for item in batch:
+                try:
+                    self._complete([item])
+                except Exception as e:
+                    item[2].set_exception(e)
+
+    def _complete(self, batch):
+        # Each caller observes these once for its own request
+        timings = {}
+        with stage(timings, "encode", observe=False):
+            vectors = self.encode_fn([query for query, _, _ in batch])
+        with stage(timings, "search", observe=False):
+            results = self.search_fn(vectors, [request for _, request, _ in batch])
+
+        for row, (_, _, future) in enumerate(batch):
+            future.set_result((vectors[row], results[row], timings))
+
+
+class IndexSnapshot:
+    """
+    One published build: index, catalog and build metadata, swapped as a
+    unit. Requests hold it between acquire() and release(); once retired
+    it drops its index and catalog as soon as the last of them finishes.
+    """
+
+    def __init__(self, version, index, meta, catalog, lexical=None):
+        self.version = version
+        self.index = index
+        self.meta = meta
+        self.catalog = catalog
+        # None for snapshots built before the lexical index existed
+        self.lexical = lexical
+        # Per-filter-set search parameters; bitmaps are only valid for this catalog
+        self.selectors = {}
+        # Cross-encoder token ids per catalog row, filled once the reranker loads
+        self.rerank_tokens = None
+        # Pre-encoded response payloads per catalog row, by response shape
+        self._fragments = {}
+
+        self.active = 0
+        self.retired = False
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """False once the snapshot is closed; callers retry with the new one."""
+        with self._lock:
+            if self.closed:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+            drained = self.retired and self.active == 0 and not self.closed
+            self.closed = self.closed or drained
+        if drained:
+            self._close()
+
+    def fragments(self, name, encode):
+        """
+        encode(record) for every catalog row, built on first use. Concurrent
+        first uses may both build it; either result is kept.
+        """
+        rows = self._fragments.get(name)
+        if rows is None:
+            catalog = self.catalog
+            rows = [encode(catalog.record(i)) for i in range(len(catalog))]
+            self._fragments[name] = rows
+        return rows
+
+    def retire(self):
+        with self._lock:
+            self.retired = True
+            drained = self.active == 0 and not self.closed
+            self.closed = self.closed or drained
+        if drained:
+            self._close()
+
+    def _close(self):
+        print(f"♻️ Snapshot {self.version} drained, releasing it")
+        self.selectors = {}
+        self.index = None
+        self.catalog = None
+        self.lexical = None
+        self.rerank_tokens = None
+        self._fragments = {}
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-INDEX_PATH = BASE_DIR / "vector_db" / "faiss.index"
-META_PATH = BASE_DIR / "vector_db" / "metadata.pkl"
- 
 
 class SHLRecommender:
-    def __init__(self):
+    def __init__(self, batch_window_ms=BATCH_WINDOW_MS,
+                 max_batch_size=MAX_BATCH_SIZE, dense_weight=DENSE_WEIGHT,
+                 lexical_weight=LEXICAL_WEIGHT, rrf_k=RRF_K,
+                 long_query_words=LONG_QUERY_WORDS, max_query_chunks=MAX_QUERY_CHUNKS,
+                 chunk_aggregation=CHUNK_AGGREGATION, rerank_depth=RERANK_DEPTH,
+                 rerank_budget_ms=RERANK_BUDGET_MS):
         # Nothing heavy is loaded here
         self.model = None
-        self.index = None
-        self.metadata = None
-        self.parse_query = None
+        self.snapshot = None
+        self.intent_parser = None
+        self.embedding_cache = EmbeddingCache(embedder_name())
+        self.dense_weight = dense_weight
+        self.lexical_weight = lexical_weight
+        self.rrf_k = rrf_k
+        self.long_query_words = long_query_words
+        self.max_query_chunks = max_query_chunks
+        self.chunk_aggregation = chunk_aggregation
+        self.rerank_depth = rerank_depth
+        self.rerank_budget = rerank_budget_ms / 1000.0
+
+        self.reranker = None
+        self._reranker_failed = False
+        self._reranker_loading = None
+        # Scores requests against their deadline; also runs background loads
+        self._rerank_pool = ThreadPoolExecutor(
+            max_workers=RERANK_WORKERS, thread_name_prefix="shl-rerank"
+        )
+        self._rerank_lock = threading.Lock()
+        # Separate from _rerank_lock, which a running load holds throughout
+        self._loading_lock = threading.Lock()
+
+        # Called with every snapshot loaded, before it serves (e.g. response
+        # fragment encoding), so no request pays for it after a reload
+        self.prepare_hooks = []
+
+        self.ready = False
+        self.load_timings = {}
+        self._load_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+        self.batcher = None
+        if batch_window_ms > 0 and max_batch_size > 1:
+            self.batcher = QueryBatcher(
+                self._encode_batch,
+                self._search_buckets,
+                window_ms=batch_window_ms,
+                max_batch_size=max_batch_size,
+            )
 
     # -------------------------------------------------
     # LAZY LOADERS (CRITICAL FOR RENDER)
     # -------------------------------------------------
+    def _timed(self, phase, fn):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        self.load_timings[phase] = elapsed
+        LOAD_SECONDS.observe(elapsed, phase=phase)
+        print(f"⏱️ {phase}: {elapsed:.2f}s")
+        return result
+
     def _load_model(self):
         if self.model is None:
             print("Loading embedding model...")
-            from sentence_transformers import SentenceTransformer
-            self.model = SentenceTransformer("all-MiniLM-L6-v2")
-
-    def _load_index(self):
-        if self.index is None:
-            print("Loading FAISS index...")
-            self.index = faiss.read_index(str(INDEX_PATH))
-
-    def _load_metadata(self):
-        if self.metadata is None:
-            print("Loading metadata...")
-            with open(META_PATH, "rb") as f:
-                self.metadata = pickle.load(f)
-            print(f"Loaded {len(self.metadata)} metadata entries")
-
-    def _load_llm(self):
-        if self.parse_query is None:
+            self.model = self._timed(
+                "model_load", lambda: load_embedder(num_threads=NUM_THREADS)
+            )
+            print(f"Embedding backend: {self.model.name}")
+
+    def _load_snapshot(self):
+        version, path = snapshots.resolve()
+        print(f"Loading snapshot {version}...")
+        if NUM_THREADS:
+            faiss.omp_set_num_threads(NUM_THREADS)
+
+        meta = index_types.load_meta(path / snapshots.META_FILE)
+        index = self._timed(
+            "index_load", lambda: self._read_index(path / snapshots.INDEX_FILE)
+        )
+        index_types.configure_search(index, meta)
+        print(f"Index type: {meta['index_type']} {meta.get('params', {})}")
+
+        catalog = self._timed(
+            "catalog_load",
+            lambda: Catalog.load(path / snapshots.CATALOG_SUBDIR, mmap=True),
+        )
+        print(f"Loaded {len(catalog)} catalog entries")
+
+        # Dense-only serving (lexical weight 0) never loads the BM25 index
+        lexical = None
+        if self.lexical_weight > 0:
+            if (path / snapshots.LEXICAL_SUBDIR).exists():
+                lexical = self._timed(
+                    "lexical_load",
+                    lambda: LexicalIndex.load(path / snapshots.LEXICAL_SUBDIR, mmap=True),
+                )
+            else:
+                print("⚠️ Snapshot has no lexical index, serving dense-only")
+
+        snapshot = IndexSnapshot(version, index, meta, catalog, lexical)
+        if self.prepare_hooks:
+            self._timed("prepare", lambda: [hook(snapshot) for hook in self.prepare_hooks])
+        return snapshot
+
+    def _read_index(self, path):
+        if INDEX_MMAP:
+            try:
+                return faiss.read_index(
+                    str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+                )
+            except RuntimeError as e:
+                print(f"⚠️ mmap not supported for this index, reading into memory: {e}")
+        return faiss.read_index(str(path))
+
+    def reload(self, force=False):
+        """
+        Load the live snapshot, warm it and swap it in. Requests already
+        running finish on the snapshot they acquired; it is released when
+        the last of them ends.
+        """
+        with self._reload_lock:
+            old = self.snapshot
+            version = snapshots.current_version() or snapshots.LEGACY_VERSION
+            if old is not None and version == old.version and not force:
+                SNAPSHOT_RELOADS.inc(result="unchanged")
+                return {"reloaded": False, "version": old.version}
+
             try:
-                from backend.llm.query_parser import parse_query
-                self.parse_query = parse_query
+                new = self._load_snapshot()
+                if self.model is not None:
+                    self._warm(new)
             except Exception:
-                self.parse_query = None
+                SNAPSHOT_RELOADS.inc(result="failed")
+                raise
+
+            self.snapshot = new
+            if old is not None:
+                old.retire()
+            SNAPSHOT_RELOADS.inc(result="reloaded")
+            print(f"✅ Serving snapshot {new.version}")
+            return {
+                "reloaded": True,
+                "version": new.version,
+                "previous": old.version if old else None,
+            }
+
+    def start_watcher(self, interval=RELOAD_CHECK_S):
+        """Poll the CURRENT pointer and reload when a new build is published."""
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                snapshot = self.snapshot
+                version = snapshots.current_version()
+                if snapshot is None or version in (None, snapshot.version):
+                    continue
+                try:
+                    self.reload()
+                except Exception as e:
+                    # Keep serving the old snapshot; the next poll retries
+                    print(f"⚠️ Reload of snapshot {version} failed: {e}")
+
+        self._watcher = threading.Thread(
+            target=watch, name="shl-snapshot-watch", daemon=True
+        )
+        self._watcher.start()
+
+    @contextmanager
+    def acquire(self, snapshot=None):
+        """
+        Pin the current snapshot for the duration of one request, or pin
+        `snapshot` again when the caller already holds it.
+        """
+        if snapshot is not None:
+            if not snapshot.acquire():
+                raise RuntimeError(f"Snapshot {snapshot.version} was released")
+        else:
+            snapshot = self.snapshot
+            while not snapshot.acquire():
+                # Lost a race with a reload that already released it
+                snapshot = self.snapshot
+        try:
+            yield snapshot
+        finally:
+            snapshot.release()
+
+    def snapshot_info(self):
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+        return {
+            "version": snapshot.version,
+            "index_type": snapshot.meta.get("index_type"),
+            "entries": len(snapshot.catalog),
+            "lexical": snapshot.lexical is not None,
+            "active_requests": snapshot.active,
+        }
+
+    # Current-snapshot shortcuts
+    @property
+    def index(self):
+        return self.snapshot.index if self.snapshot else None
+
+    @property
+    def index_meta(self):
+        return self.snapshot.meta if self.snapshot else None
+
+    @property
+    def catalog(self):
+        return self.snapshot.catalog if self.snapshot else None
+
+    def load_reranker(self):
+        """The cross-encoder, loaded on first use; None if it cannot load."""
+        if self.reranker is not None or self._reranker_failed:
+            return self.reranker
+        with self._rerank_lock:
+            if self.reranker is None and not self._reranker_failed:
+                try:
+                    reranker = self._timed(
+                        "reranker_load",
+                        lambda: CrossEncoderReranker(num_threads=NUM_THREADS),
+                    )
+                except Exception as e:
+                    print(f"⚠️ Reranker unavailable, serving first-stage order: {e}")
+                    self._reranker_failed = True
+                    return None
+                self.reranker = reranker
+                print(f"Reranker: {reranker.name}")
+
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.acquire():
+            try:
+                self._timed("rerank_prepare", lambda: self._rerank_tokens(snapshot))
+            finally:
+                snapshot.release()
+        return self.reranker
+
+    def load_reranker_async(self):
+        """Start load_reranker() on the rerank pool, at most once."""
+        if self._reranker_loading is not None:
+            return
+        with self._loading_lock:
+            if (self.reranker is None and not self._reranker_failed
+                    and self._reranker_loading is None):
+                self._reranker_loading = self._rerank_pool.submit(self.load_reranker)
+
+    def _rerank_tokens(self, snapshot):
+        if snapshot.rerank_tokens is None:
+            with self._rerank_lock:
+                if snapshot.rerank_tokens is None:
+                    snapshot.rerank_tokens = self.reranker.prepare(snapshot.catalog)
+        return snapshot.rerank_tokens
+
+    def _load_intent_parser(self):
+        if self.intent_parser is None:
+            from backend.llm.intent import RoutedIntentParser, RuleIntentParser, load_intent_parser
+            try:
+                self.intent_parser = load_intent_parser(encode=self._encode_batch)
+            except Exception as e:
+                print(f"⚠️ Intent LLM unavailable, using rules only: {e}")
+                self.intent_parser = RoutedIntentParser(
+                    RuleIntentParser(self._encode_batch), None
+                )
+        return self.intent_parser
+
+    def _ensure_loaded(self):
+        if self.ready:
+            return
+        with self._load_lock:
+            if self.ready:
+                return
+            self._load_model()
+            if self.snapshot is None:
+                self.snapshot = self._load_snapshot()
+            self.ready = True
+
+    def warmup(self):
+        """Eager mode: load everything and run a dummy query before serving."""
+        self._ensure_loaded()
+        self._timed("warmup", lambda: self._warm(self.snapshot))
+
+    def _warm(self, snapshot):
+        # Bypasses the embedding cache so no dummy entry is stored
+        query = "warmup query for java developer"
+        vectors = self._encode_uncached([query])
+        self._search_buckets(vectors, [(10, NO_FILTERS, snapshot, query)])
+        if self.reranker is not None:
+            # Reloads tokenize the new catalog before it is swapped in
+            self._rerank_tokens(snapshot)
+
+    # -------------------------------------------------
+    # ENCODING + SEARCH
+    # -------------------------------------------------
+    def _encode_batch(self, queries):
+        return self.embedding_cache.encode(queries, self._encode_uncached)
+
+    def _encode_uncached(self, queries):
+        return self.model.encode(queries)
+
+    def _bucket_selectors(self, snapshot, filters):
+        """Cached per-bucket FAISS search parameters for one filter set."""
+        entry = snapshot.selectors.get(filters)
+        if entry is None:
+            entry = {}
+            for bucket, (include, exclude) in BUCKETS.items():
+                mask = snapshot.catalog.mask(include, exclude, filters)
+                bitmap = np.packbits(mask, bitorder="little")
+                selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+                params = index_types.search_parameters(
+                    snapshot.meta, selector, snapshot.index
+                )
+                # bitmap and selector must outlive the search parameters;
+                # the lexical side filters with the unpacked mask
+                entry[bucket] = (params, selector, bitmap, int(mask.sum()), mask)
+
+            if len(snapshot.selectors) >= MAX_CACHED_SELECTORS:
+                snapshot.selectors.clear()
+            snapshot.selectors[filters] = entry
+        return entry
+
+    def _bucket_selector(self, snapshot, filters, bucket, k):
+        selector = self._bucket_selectors(snapshot, filters)[bucket]
+        for relaxed in filters.relaxations():
+            if selector[3] >= k:
+                break
+            # Too strict for this catalog: drop job levels, then all filters
+            FILTERS_RELAXED.inc(bucket=bucket)
+            selector = self._bucket_selectors(snapshot, relaxed)[bucket]
+        return selector
+
+    def _search_buckets(self, vectors, requests):
+        """
+        requests[i] = (k, filters, snapshot, query) for vector row i. Each
+        intent bucket is searched with an ID selector, so only eligible items
+        are scored. Rows sharing a snapshot and filter set are searched
+        together in one call; the BM25 ranking of the same bucket is then
+        fused in by reciprocal rank.
+        """
+        results = [{"snapshot": request[2]} for request in requests]
+        groups = {}
+        for row, (_, filters, snapshot, _) in enumerate(requests):
+            groups.setdefault((snapshot, filters), []).append(row)
+
+        for (snapshot, filters), rows in groups.items():
+            k = max(requests[row][0] for row in rows)
+            group_vectors = vectors if len(rows) == len(requests) else vectors[rows]
+            lexical = self._lexical_scores(snapshot, [requests[row][3] for row in rows])
+
+            for bucket in BUCKETS:
+                # Held for the call: the cache may be cleared concurrently
+                selector = self._bucket_selector(snapshot, filters, bucket, k)
+                _, found = snapshot.index.search(group_vectors, k, params=selector[0])
+                for row, indices, scores in zip(rows, found, lexical):
+                    row_k = requests[row][0]
+                    ranked = self._valid(indices[:row_k], snapshot.catalog)
+                    results[row][bucket] = self._fuse(ranked, scores, row_k, selector[4])
+
+        return results
+
+    def _search_chunks(self, vectors, request):
+        """
+        One long query whose sentence windows are the rows of `vectors`:
+        each bucket is one multi-row search, merged per item by the chunk
+        aggregation before fusion.
+        """
+        k, filters, snapshot, query = request
+        result = {"snapshot": snapshot}
+        scores = self._lexical_scores(snapshot, [query])[0]
+
+        for bucket in BUCKETS:
+            selector = self._bucket_selector(snapshot, filters, bucket, k)
+            distances, found = snapshot.index.search(vectors, k, params=selector[0])
+            ranked = chunking.aggregate(distances, found, self.chunk_aggregation)
+            ranked = self._valid(ranked, snapshot.catalog)[:k]
+            result[bucket] = self._fuse(ranked, scores, k, selector[4])
+
+        return result
+
+    def _fuse(self, ranked, scores, k, mask):
+        if scores is None:
+            return ranked
+        return reciprocal_rank_fusion(
+            [ranked, LexicalIndex.top(scores, k, mask)],
+            [self.dense_weight, self.lexical_weight],
+            self.rrf_k,
+        )[:k]
+
+    def _lexical_scores(self, snapshot, queries):
+        """BM25 scores per query (None = dense ranking only)."""
+        if snapshot.lexical is None or self.lexical_weight <= 0:
+            return [None] * len(queries)
+        scores = []
+        for query in queries:
+            # Per query, like the other stages, even inside a batch
+            with stage(None, "lexical"):
+                scores.append(snapshot.lexical.scores(query))
+        return scores
+
+    def query_chunks(self, query: str):
+        """The sentence windows encoded for query ([query] unless it is long)."""
+        chunks = chunking.split_query(query, self.long_query_words, CHUNK_WORDS)
+        if len(chunks) > 1:
+            capped = len(chunks) > self.max_query_chunks
+            LONG_QUERIES.inc(capped="yes" if capped else "no")
+            chunks = chunking.spread(chunks, self.max_query_chunks)
+        return chunks
+
+    def _encode_and_search(self, query: str, k: int, filters, snapshot, timings=None,
+                           on_vector=None):
+        """
+        Query vector and bucket rankings. on_vector(vector) is called as
+        soon as the vector is known, before the rest of the request runs.
+        """
+        request = (k, filters, snapshot, query)
+        notify = on_vector or (lambda vector: None)
+
+        chunks = self.query_chunks(query)
+        if len(chunks) > 1:
+            # Already a batch of its own: skips the batcher, windows are cached
+            with stage(timings, "encode"):
+                vectors = self._encode_batch(chunks)
+            notify(vectors.mean(axis=0))
+            with stage(timings, "search"):
+                buckets = self._search_chunks(vectors, request)
+            return vectors.mean(axis=0), buckets
+
+        # Cache hits skip the transformer (and the batching window) entirely
+        cached = self.embedding_cache.get(query)
+        if cached is not None:
+            notify(cached)
+            with stage(timings, "search"):
+                buckets = self._search_buckets(cached[None, :], [request])[0]
+            return cached, buckets
+
+        if self.batcher is not None:
+            # The batch encodes and searches in one go: search is the cheap half
+            start = time.perf_counter()
+            vector, buckets, batch_timings = self.batcher.search(query, request)
+            notify(vector)
+            waited = max(time.perf_counter() - start - sum(batch_timings.values()), 0.0)
+            STAGE_SECONDS.observe(waited, stage="batch_wait")
+            for name, seconds in batch_timings.items():
+                STAGE_SECONDS.observe(seconds, stage=name)
+            if timings is not None:
+                for name, seconds in batch_timings.items():
+                    timings[name] = timings.get(name, 0.0) + seconds
+                timings["batch_wait"] = timings.get("batch_wait", 0.0) + waited
+            return vector, buckets
+
+        with stage(timings, "encode"):
+            vectors = self._encode_batch([query])
+        notify(vectors[0])
+        with stage(timings, "search"):
+            buckets = self._search_buckets(vectors, [request])[0]
+        return vectors[0], buckets
+
+    def stats(self):
+        return {"embedding_cache": self.embedding_cache.stats()}
 
     # -------------------------------------------------
     # RECOMMENDATION LOGIC
     # -------------------------------------------------
-    def recommend(self, query: str, top_k=10, use_llm=False):
+    def filters_for(self, query: str):
+        return extract_filters(query) if QUERY_FILTERS else NO_FILTERS
+
+    def recommend(self, query: str, top_k=10, use_llm=False, timings=None,
+                  filters=None, rerank_depth=None, render=None):
+        deadline = time.perf_counter() + self.rerank_budget
         # Lazy load everything
-        self._load_model()
-        self._load_index()
-        self._load_metadata()
-
-        intent = "mixed"
-        if use_llm:
-            self._load_llm()
-            if self.parse_query:
-                try:
-                    intent_data = self.parse_query(query)
-                    intent = intent_data.get("intent", "mixed")
-                except Exception:
-                    intent = "mixed"
+        self._ensure_loaded()
 
-        query_vec = self.model.encode([query]).astype("float32")
-        faiss.normalize_L2(query_vec)
+        filters = filters or self.filters_for(query)
+        with self.acquire() as snapshot:
+            vector, buckets = self._retrieve_ranked(
+                query, top_k, filters, timings, snapshot, rerank_depth, deadline
+            )
 
-        _, indices = self.index.search(query_vec, top_k * 5)
+            intent = "mixed"
+            if use_llm:
+                with stage(timings, "intent"):
+                    intent = self._resolve_intent(query, vector)
 
-        candidates = []
-        for i in indices[0]:
-            if i < len(self.metadata):
-                candidates.append(self.metadata[i])
+            with stage(timings, "filter"):
+                return self.select(buckets, intent, top_k, render)
 
-        technical, behavioral = [], []
+    async def recommend_async(self, query: str, top_k=10, use_llm=False,
+                              executor=None, llm_timeout=LLM_TIMEOUT,
+                              timings=None, filters=None, rerank_depth=None,
+                              render=None, snapshot=None, degraded=None):
+        """
+        Run intent parsing and retrieval concurrently: both intent buckets
+        are retrieved (and reranked) up front, so latency is roughly
+        max(intent, encode + search + rerank). Intent rules that need the
+        query embedding wait for the encode only, not for search and
+        rerank; only unsure queries reach the LLM.
+        Pass a snapshot pinned with acquire() to serve from it. Fallbacks
+        taken ("rerank_deadline", "intent_fallback", ...) are appended to
+        the `degraded` list, so callers can avoid caching the result.
+        """
+        deadline = time.perf_counter() + self.rerank_budget
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, self._ensure_loaded)
 
-        for c in candidates:
-            raw = c.get("test_types_list", [])
+        filters = filters or self.filters_for(query)
+        with self.acquire(snapshot) as snapshot:
+            # Resolved right after encode, so intent rules and the LLM do
+            # not wait for search and rerank
+            encoded = loop.create_future()
 
-            if isinstance(raw, str):
-                raw = raw.strip("[]")
-                types = {
-                    t.strip().strip("'").strip('"')
-                    for t in raw.split(",")
-                    if t.strip()
-                }
-            else:
-                types = set(raw or [])
+            def on_vector(vector):
+                loop.call_soon_threadsafe(
+                    lambda: encoded.done() or encoded.set_result(vector)
+                )
 
-            if "K" in types:
-                technical.append(c)
-            elif any(t in types for t in ["P", "C", "B"]):
-                behavioral.append(c)
+            retrieval = loop.run_in_executor(
+                executor, self._retrieve_ranked, query, top_k, filters, timings,
+                snapshot, rerank_depth, deadline, on_vector
+            )
 
-        if intent == "technical":
-            return technical[:top_k]
+            async def query_vector():
+                await asyncio.wait([encoded, retrieval],
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if encoded.done():
+                    return encoded.result()
+                vector, _ = await retrieval
+                return vector
 
-        if intent == "behavioral":
-            return behavioral[:top_k]
+            intent = "mixed"
+            if use_llm:
+                with stage(timings, "intent"):
+                    parsed = await self._resolve_intent_async(
+                        query, llm_timeout, query_vector
+                    )
+                intent = parsed["intent"]
+                if degraded is not None and parsed["source"] == "fallback":
+                    degraded.append("intent_fallback")
+
+            _, buckets = await retrieval
+            if degraded is not None and "fallback" in buckets:
+                degraded.append(f"rerank_{buckets['fallback']}")
+            with stage(timings, "filter"):
+                return self.select(buckets, intent, top_k, render)
+
+    def _retrieve_ranked(self, query, top_k, filters, timings, snapshot,
+                         rerank_depth, deadline, on_vector=None):
+        """Query vector and bucket rankings: first-stage, reranked when enabled."""
+        depth = self.rerank_depth if rerank_depth is None else rerank_depth
+        vector, buckets = self._encode_and_search(
+            query, max(top_k, depth), filters, snapshot, timings, on_vector
+        )
+        if depth <= 0:
+            return vector, buckets
+        return vector, self.rerank(query, buckets, top_k, depth, deadline, timings)
+
+    def rerank(self, query, buckets, top_k, depth, deadline, timings=None):
+        """
+        Reorder the top `depth` of each bucket by cross-encoder score, all
+        candidates in one batch. If the scores are not back by `deadline`
+        (perf_counter time), or the reranker is unavailable (failed, or not
+        loaded yet: the first request starts a background load), the
+        buckets keep their first-stage order and name the reason under
+        "fallback".
+        """
+        first_stage = self._first_stage(buckets, top_k)
+        if self._reranker_failed:
+            # Not transient: first-stage order is what this process serves
+            RERANK_FALLBACKS.inc(reason="unavailable")
+            return first_stage
+        if self.reranker is None:
+            # Loading the model and tokenizing the catalog would blow any
+            # request's budget: serve first-stage order while it loads
+            self.load_reranker_async()
+            return self._fallback(first_stage, "unavailable")
+
+        snapshot = buckets["snapshot"]
+        candidates = self._rerank_candidates(buckets, depth)
+        if len(candidates) == 0:
+            return first_stage
 
+        def score():
+            # The request may give up (and release its snapshot) first
+            if not snapshot.acquire():
+                raise RuntimeError(f"Snapshot {snapshot.version} was released")
+            try:
+                tokens = self._rerank_tokens(snapshot)
+                return self.reranker.score(query, [tokens[i] for i in candidates])
+            finally:
+                snapshot.release()
+
+        with stage(timings, "rerank"):
+            future = self._rerank_pool.submit(score)
+            try:
+                scores = future.result(timeout=max(deadline - time.perf_counter(), 0.0))
+            except FutureTimeoutError:
+                future.cancel()
+                return self._fallback(first_stage, "deadline")
+            except Exception as e:
+                print(f"⚠️ Rerank failed: {e}")
+                return self._fallback(first_stage, "error")
+
+        return self._reorder(buckets, candidates, scores, top_k, depth)
+
+    @staticmethod
+    def _fallback(buckets, reason):
+        RERANK_FALLBACKS.inc(reason=reason)
+        return {**buckets, "fallback": reason}
+
+    def rerank_many(self, queries, rows, snapshot, top_k, depth):
+        """
+        rerank() for retrieve_many: every query's candidates are scored in
+        one cross-encoder call. Batches have no latency budget, so this
+        waits for the reranker to load instead of falling back.
+        """
+        first_stage = [self._first_stage(buckets, top_k) for buckets in rows]
+        if not rows:
+            return first_stage
+        if self.load_reranker() is None:
+            RERANK_FALLBACKS.inc(len(rows), reason="unavailable")
+            return first_stage
+
+        candidates = [self._rerank_candidates(buckets, depth) for buckets in rows]
+        scored = [i for i, c in enumerate(candidates) if len(c)]
+        try:
+            with stage(None, "rerank_batch"):
+                tokens = self._rerank_tokens(snapshot)
+                scores = self.reranker.score_many([
+                    (queries[i], [tokens[j] for j in candidates[i]]) for i in scored
+                ])
+        except Exception as e:
+            print(f"⚠️ Batch rerank failed: {e}")
+            RERANK_FALLBACKS.inc(len(rows), reason="error")
+            return first_stage
+
+        for i, row_scores in zip(scored, scores):
+            first_stage[i] = self._reorder(rows[i], candidates[i], row_scores, top_k, depth)
+        return first_stage
+
+    @staticmethod
+    def _first_stage(buckets, top_k):
+        return {**buckets, **{b: buckets[b][:top_k] for b in BUCKETS}}
+
+    @staticmethod
+    def _rerank_candidates(buckets, depth):
+        return np.unique(np.concatenate([buckets[b][:depth] for b in BUCKETS]))
+
+    @staticmethod
+    def _reorder(buckets, candidates, scores, top_k, depth):
+        score_of = dict(zip(candidates.tolist(), scores))
+        reranked = {"snapshot": buckets["snapshot"]}
+        for bucket in BUCKETS:
+            ranked = buckets[bucket][:depth]
+            reranked[bucket] = rerank_order(
+                ranked, [score_of[i] for i in ranked.tolist()]
+            )[:top_k]
+        return reranked
+
+    def recommend_many(self, queries, top_k=10, use_llm=False, render=None,
+                       rerank_depth=None):
+        """
+        Batch variant of recommend: one encode call, one search per filter
+        set and, when reranking, one cross-encoder call.
+        """
+        self._ensure_loaded()
+        depth = self.rerank_depth if rerank_depth is None else rerank_depth
+
+        with self.acquire() as snapshot:
+            vectors, rows = self.retrieve_many(queries, top_k, snapshot, depth)
+            intents = [
+                self._resolve_intent(q, vector) if use_llm else "mixed"
+                for q, vector in zip(queries, vectors)
+            ]
+            return [
+                self.select(buckets, intent, top_k, render)
+                for buckets, intent in zip(rows, intents)
+            ]
+
+    async def recommend_many_async(self, queries, top_k=10, use_llm=False,
+                                   executor=None, llm_timeout=LLM_TIMEOUT,
+                                   render=None, rerank_depth=None):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, self._ensure_loaded)
+        depth = self.rerank_depth if rerank_depth is None else rerank_depth
+
+        with self.acquire() as snapshot:
+            retrieval = loop.run_in_executor(
+                executor, self.retrieve_many, queries, top_k, snapshot, depth
+            )
+
+            async def query_vector(row):
+                vectors, _ = await retrieval
+                return vectors[row]
+
+            intents = ["mixed"] * len(queries)
+            if use_llm:
+                intents = await asyncio.gather(*(
+                    self._resolve_intent_async(
+                        q, llm_timeout, lambda row=row: query_vector(row)
+                    )
+                    for row, q in enumerate(queries)
+                ))
+                intents = [parsed["intent"] for parsed in intents]
+
+            _, rows = await retrieval
+            return [
+                self.select(buckets, intent, top_k, render)
+                for buckets, intent in zip(rows, intents)
+            ]
+
+    def _resolve_intent(self, query: str, vector=None, timeout=LLM_TIMEOUT):
+        """Intent label; LLM failures fall back to the rule-based guess."""
+        return self._load_intent_parser().parse(query, vector, timeout)["intent"]
+
+    async def _resolve_intent_async(self, query: str, timeout: float, vector=None):
+        """The full parse result; source "fallback" when the LLM failed."""
+        parser = self._load_intent_parser()
+        return await parser.parse_async(query, vector, timeout)
+
+    def retrieve(self, query: str, top_k: int, filters=NO_FILTERS, timings=None,
+                 snapshot=None):
+        """
+        Query vector and the best eligible rows of each intent bucket.
+        Pass a snapshot pinned with acquire() when reloads may happen.
+        """
+        snapshot = snapshot or self.snapshot
+        return self._encode_and_search(query, top_k, filters, snapshot, timings)
+
+    def retrieve_many(self, queries, top_k: int, snapshot=None, rerank_depth=0):
+        """
+        One encode call for all queries (long ones contribute their windows),
+        then one search per filter set for the short queries and one
+        multi-row search per long query. With rerank_depth > 0 the top
+        candidates of every query are reranked in one batch.
+        """
+        snapshot = snapshot or self.snapshot
+        k = max(top_k, rerank_depth)
+        queries = list(queries)
+        chunks = [self.query_chunks(q) for q in queries]
+        # Whole-batch timings, kept apart from the per-request stages
+        with stage(None, "encode_batch"):
+            vectors = self._encode_batch([c for query_chunks in chunks for c in query_chunks])
+
+        bounds = np.cumsum([0] + [len(c) for c in chunks])
+        requests = [(k, self.filters_for(q), snapshot, q) for q in queries]
+        short = [i for i, c in enumerate(chunks) if len(c) == 1]
+
+        rows = [None] * len(queries)
+        with stage(None, "search_batch"):
+            for i, buckets in zip(short, self._search_buckets(
+                    vectors[bounds[short]], [requests[i] for i in short])):
+                rows[i] = buckets
+            for i, c in enumerate(chunks):
+                if len(c) > 1:
+                    rows[i] = self._search_chunks(vectors[bounds[i]:bounds[i + 1]], requests[i])
+
+        if rerank_depth > 0:
+            rows = self.rerank_many(queries, rows, snapshot, top_k, rerank_depth)
+
+        query_vectors = np.stack([
+            vectors[bounds[i]:bounds[i + 1]].mean(axis=0) for i in range(len(queries))
+        ]) if queries else vectors
+        return query_vectors, rows
+
+    def _valid(self, indices, catalog):
+        return indices[(indices >= 0) & (indices < len(catalog))]
+
+    @staticmethod
+    def _wanted(intent: str, top_k: int):
+        """How many (technical, behavioral) results the intent asks for."""
+        if intent == "technical":
+            return top_k, 0
+        if intent == "behavioral":
+            return 0, top_k
         half = top_k // 2
-        return (technical[:half] + behavioral[:top_k - half])[:top_k]
+        return half, top_k - half
+
+    def select(self, buckets, intent: str, top_k: int, render=None):
+        """
+        Pick results from the intent buckets and build the result records,
+        or return render(snapshot, row ids) when a renderer is given.
+        """
+        technical, behavioral = buckets["technical"], buckets["behavioral"]
+
+        want_t, want_b = self._wanted(intent, top_k)
+        if len(technical) < want_t:
+            CANDIDATE_POOL_EXHAUSTED.inc(bucket="technical")
+        if len(behavioral) < want_b:
+            CANDIDATE_POOL_EXHAUSTED.inc(bucket="behavioral")
+
+        if intent == "technical":
+            selected = technical[:top_k]
+        elif intent == "behavioral":
+            selected = behavioral[:top_k]
+        else:
+            # If the catalog runs out of one bucket, the other fills the gap
+            take_t = min(len(technical), max(want_t, top_k - len(behavioral)))
+            take_b = top_k - take_t
+            selected = np.concatenate(
+                [technical[:take_t], behavioral[:take_b]]
+            )[:top_k]
 
+        snapshot = buckets["snapshot"]
+        if render is not None:
+            return render(snapshot, selected)
+        return snapshot.catalog.records(selected)
@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+
+RERANK_MODEL = os.getenv("SHL_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# Pair length; the query keeps at most MAX_QUERY_TOKENS, the candidate the rest
+MAX_LENGTH = 256
+MAX_QUERY_TOKENS = 96
+# Pairs per forward pass: bounds activation memory however many are scored
+RERANK_BATCH_SIZE = int(os.getenv("SHL_RERANK_BATCH_SIZE", "32"))
+
+
+def candidate_text(catalog, i):
+    """What the cross-encoder reads for catalog row i."""
+    parts = [catalog.name(i)]
+    types = catalog.record(i)["test_types_full"]
+    if types:
+        parts.append(", ".join(types))
+    description = catalog.description(i)
+    if description:
+        parts.append(description)
+    return ". ".join(parts)
+
+
+class CrossEncoderReranker:
+    """
+    Second-stage scorer: forward passes of up to `batch_size` (query,
+    candidate) pairs. Candidates are tokenized once per snapshot (prepare);
+    a request only tokenizes its query and concatenates ids.
+    """
+
+    def __init__(self, model_name=RERANK_MODEL, num_threads=0,
+                 max_length=MAX_LENGTH, max_query_tokens=MAX_QUERY_TOKENS,
+                 batch_size=RERANK_BATCH_SIZE):
+        import torch
+        from sentence_transformers import CrossEncoder
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        self.torch = torch
+        self.name = model_name
+        self.encoder = CrossEncoder(model_name, max_length=max_length, device="cpu")
+        self.encoder.model.eval()
+        self.tokenizer = self.encoder.tokenizer
+        self.max_length = max_length
+        self.max_query_tokens = max_query_tokens
+        self.batch_size = max(1, batch_size)
+        self.special_tokens = self.tokenizer.num_special_tokens_to_add(pair=True)
+
+    def prepare(self, catalog):
+        """Candidate token ids for every catalog row (deleted ids get [])."""
+        texts = [candidate_text(catalog, i) for i in range(len(catalog))]
+        return self.tokenizer(
+            texts,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=self.max_length - self.special_tokens,
+        )["input_ids"]
+
+    def score(self, query, candidates):
+        """Relevance of each pre-tokenized candidate to query."""
+        return self.score_many([(query, candidates)])[0]
+
+    def score_many(self, requests):
+        """
+        score() for several (query, candidates) requests, their pairs run
+        through the model batch_size at a time; returns one score array
+        per request.
+        """
+        features = {"input_ids": [], "token_type_ids": []}
+        sizes = []
+        for query, candidates in requests:
+            query_ids = self.tokenizer(
+                query,
+                add_special_tokens=False,
+                truncation=True,
+                max_length=self.max_query_tokens,
+            )["input_ids"]
+            room = self.max_length - self.special_tokens - len(query_ids)
+
+            for ids in candidates:
+                ids = ids[:room]
+                features["input_ids"].append(
+                    self.tokenizer.build_inputs_with_special_tokens(query_ids, ids)
+                )
+                features["token_type_ids"].append(
+                    self.tokenizer.create_token_type_ids_from_sequences(query_ids, ids)
+                )
+            sizes.append(len(candidates))
+
+        if "token_type_ids" not in self.tokenizer.model_input_names:
+            del features["token_type_ids"]
+        scores = [np.zeros(0, dtype="float32")]
+        for start in range(0, len(features["input_ids"]), self.batch_size):
+            batch = self.tokenizer.pad(
+                {name: ids[start:start + self.batch_size] for name, ids in features.items()},
+                return_tensors="pt",
+            )
+            with self.torch.inference_mode():
+                logits = self.encoder.model(**batch).logits
+            # ms-marco cross-encoders have one relevance logit
+            scores.append(logits[:, -1].float().numpy())
+        return np.split(np.concatenate(scores), np.cumsum(sizes)[:-1])
+
+
+def rerank_order(ranked, scores):
+    """ranked reordered by score (higher first); ties keep first-stage order."""
+    return ranked[np.argsort(-np.asarray(scores), kind="stable")]
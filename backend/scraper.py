@@ -8,10 +8,14 @@ from tqdm import tqdm
 import os
 import re
 
+BASE_URL = "https://www.shl.com/products/product-catalog/"
+TOTAL_PAGES = 32
+ITEMS_PER_PAGE = 12
+
 
 class SHLCatalogScraper:
-    def __init__(self):
-        self.base_url = "https://www.shl.com/products/product-catalog/"
+    def __init__(self, base_url=BASE_URL):
+        self.base_url = base_url
         self.headers = {
             "User-Agent": (
                 "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -83,9 +87,6 @@ class SHLCatalogScraper:
         """Scrape ONLY Individual Test Solutions"""
         print("🚀 Scraping ONLY Individual Test Solutions")
 
-        TOTAL_PAGES = 32
-        ITEMS_PER_PAGE = 12
-
         all_products = []
 
         for page in tqdm(range(TOTAL_PAGES), desc="Pages"):
@@ -136,6 +137,7 @@ def main():
     print("=" * 70)
     print("SHL INDIVIDUAL TEST SOLUTION SCRAPER")
     print("=" * 70)
+    print("(sequential; python -m backend.crawler is the concurrent crawler)")
 
     scraper = SHLCatalogScraper()
     scraper.scrape_all_products()
@@ -0,0 +1,55 @@
+import argparse
+import os
+
+import uvicorn
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def plan_workers(cores, workers=None, threads=None):
+    """Split cores between worker processes so they don't oversubscribe."""
+    if workers is None and threads is None:
+        threads = 1 if cores < 4 else 2
+    if workers is None:
+        workers = max(1, cores // threads)
+    if threads is None:
+        threads = max(1, cores // workers)
+    return workers, threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the SHL API with N workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch/FAISS/OMP threads per worker")
+    args = parser.parse_args()
+
+    cores = available_cores()
+    workers, threads = plan_workers(cores, args.workers, args.threads)
+
+    # Inherited by every worker process
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    os.environ["SHL_NUM_THREADS"] = str(threads)
+    os.environ.setdefault("SHL_INDEX_MMAP", "1")
+
+    print(f"🚀 {cores} cores → {workers} workers × {threads} threads")
+    uvicorn.run(
+        "backend.api.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        timeout_keep_alive=75,
+    )
+
+
+if __name__ == "__main__":
+    main()
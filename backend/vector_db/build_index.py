@@ -1,42 +1,388 @@
+import argparse
+import hashlib
+import json
+import time
+import numpy as np
 import pandas as pd
 import faiss
-import pickle
 from sentence_transformers import SentenceTransformer
-from pathlib import Path
+
+from backend.data_enricher import SHLDataEnricher
+from backend.rag.lexical import LexicalIndex
+from backend.vector_db import index_types, snapshots
+from backend.vector_db.catalog import Catalog
 
 DATA_PATH = "backend/data/shl_products_enriched.csv"
-INDEX_PATH = "backend/vector_db/faiss.index"
-META_PATH = "backend/vector_db/metadata.pkl"
+SCRAPER_PATH = "backend/data/shl_individual_tests.csv"
+REPORT_PATH = "backend/vector_db/index_report.json"
+EVAL_QUERY_PATHS = ["backend/data/train.csv", "backend/data/test.csv"]
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Rows read (and embedded) per step, and sentences per model.encode batch
+CHUNK_SIZE = 5000
+EMBED_BATCH_SIZE = 64
+
+# Rebuild with dense ids once deleted rows make up this share of all ids
+MAX_TOMBSTONE_RATIO = 0.2
+
+
+def parse_params(pairs):
+    params = {}
+    for pair in pairs or []:
+        key, value = pair.split("=", 1)
+        params[key] = float(value) if "." in value else int(value)
+    return params
+
+
+def content_hash(text):
+    return hashlib.sha256(str(text).encode("utf-8")).hexdigest()[:16]
+
+
+def record_hash(record):
+    """Hash of every catalog field, so metadata-only changes are published too."""
+    return content_hash(json.dumps(record, sort_keys=True, default=str))
+
+
+def iter_rows(from_scraper=False):
+    """Enriched rows in chunks: from the enriched CSV, or enriched on the fly."""
+    if from_scraper:
+        enricher = SHLDataEnricher()
+        return enricher.iter_enriched(SCRAPER_PATH, CHUNK_SIZE)
+    return pd.read_csv(DATA_PATH, chunksize=CHUNK_SIZE)
+
+
+def embed_rows(chunks, previous, load_model):
+    """
+    Embed rows chunk by chunk as they arrive, reusing the previous
+    snapshot's vector wherever a row's URL and content hash are unchanged.
+    Returns (rows, hashes, vectors, number of rows embedded).
+    """
+    frames, hashes, vectors = [], [], []
+    embedded = 0
+
+    for chunk in chunks:
+        chunk = chunk.reset_index(drop=True)
+        texts = chunk["embedding_text"].fillna("").astype(str).tolist()
+        chunk_hashes = [content_hash(t) for t in texts]
+        chunk_vectors = [None] * len(chunk)
+
+        if previous is not None:
+            for i, (url, h) in enumerate(zip(chunk["url"], chunk_hashes)):
+                row = previous["rows"].get(url)
+                if row is not None and row["hash"] == h:
+                    chunk_vectors[i] = previous["vectors"][row["id"]]
+
+        missing = [i for i, v in enumerate(chunk_vectors) if v is None]
+        if missing:
+            encoded = load_model().encode(
+                [texts[i] for i in missing], batch_size=EMBED_BATCH_SIZE
+            ).astype("float32")
+            faiss.normalize_L2(encoded)
+            for i, vector in zip(missing, encoded):
+                chunk_vectors[i] = vector
+            embedded += len(missing)
+            print(f"⚡ Embedded {embedded} rows...")
+
+        frames.append(chunk)
+        hashes.extend(chunk_hashes)
+        vectors.extend(chunk_vectors)
+
+    df = pd.concat(frames, ignore_index=True)
+    df["embedding_text"] = df["embedding_text"].fillna("")
+    vectors = np.vstack(vectors).astype("float32")
+
+    keep = ~df["url"].duplicated(keep="last").to_numpy()
+    if not keep.all():
+        print(f"⚠️ Dropping {int((~keep).sum())} rows with duplicate URLs")
+        df = df[keep].reset_index(drop=True)
+        vectors = vectors[keep]
+        hashes = [h for h, k in zip(hashes, keep) if k]
+
+    return df, hashes, vectors, embedded
+
+
+def load_previous():
+    """State of the live snapshot, or None for a first / legacy build."""
+    version, path = snapshots.resolve()
+    state = snapshots.load_rows(path)
+    if state is None:
+        return None
+
+    return {
+        "version": version,
+        "path": path,
+        "model": state["model"],
+        "next_id": state["next_id"],
+        "rows": state["rows"],
+        "vectors": np.load(path / snapshots.VECTORS_FILE),
+        "meta": index_types.load_meta(path / snapshots.META_FILE),
+    }
+
+
+def plan_update(previous, urls, hashes, record_hashes, index_type, params):
+    """
+    Ids for an in-place update of the previous index, or None when it has
+    to be rebuilt (first build, other index type/params, too many holes).
+    "updated" rows are re-embedded; "changed" rows keep their vector but
+    have new catalog fields (duration, description, job levels, ...).
+    """
+    if previous is None or index_type not in index_types.REMOVABLE_TYPES:
+        return None
+    meta = previous["meta"]
+    if meta.get("index_type") != index_type:
+        return None
+    if any(meta.get("params", {}).get(k) != v for k, v in (params or {}).items()):
+        return None
+
+    rows = previous["rows"]
+    next_id = previous["next_id"]
+    ids, added, updated, changed = [], [], [], []
+
+    for i, (url, h, r) in enumerate(zip(urls, hashes, record_hashes)):
+        row = rows.get(url)
+        if row is None:
+            ids.append(next_id)
+            added.append(i)
+            next_id += 1
+        else:
+            ids.append(row["id"])
+            if row["hash"] != h:
+                updated.append(i)
+            elif row.get("record") != r:
+                # Snapshots from before record hashes count as changed once
+                changed.append(i)
+
+    current = set(urls)
+    removed = [row["id"] for url, row in rows.items() if url not in current]
+
+    if (next_id - len(urls)) / max(next_id, 1) > MAX_TOMBSTONE_RATIO:
+        print("♻️ Too many deleted rows, compacting ids")
+        return None
+
+    return {
+        "ids": np.array(ids, dtype="int64"),
+        "next_id": next_id,
+        "added": added,
+        "updated": updated,
+        "changed": changed,
+        "removed": removed,
+    }
+
+
+def update_index(previous, plan, vectors):
+    """Apply removals and replacements to the previous ID-mapped index."""
+    index = faiss.read_index(str(previous["path"] / snapshots.INDEX_FILE))
+    ids = plan["ids"]
+
+    stale = plan["removed"] + [int(ids[i]) for i in plan["updated"]]
+    if stale:
+        index.remove_ids(np.array(stale, dtype="int64"))
+
+    fresh = plan["added"] + plan["updated"]
+    if fresh:
+        index.add_with_ids(vectors[fresh], ids[fresh])
+
+    return index
+
+
+def build_faiss_index(index_type="flat", params=None, report=False, full=False,
+                      keep=snapshots.KEEP_SNAPSHOTS, from_scraper=False):
+    previous = None if full else load_previous()
+    if previous is not None and previous["model"] != MODEL_NAME:
+        print(f"⚠️ Snapshot was embedded with {previous['model']}, rebuilding")
+        previous = None
+
+    model = None
+
+    def load_model():
+        nonlocal model
+        if model is None:
+            print("🧠 Loading embedding model...")
+            model = SentenceTransformer(MODEL_NAME)
+        return model
 
-def build_faiss_index():
     print("🔄 Loading enriched dataset...")
-    df = pd.read_csv(DATA_PATH)
+    df, hashes, vectors, embedded = embed_rows(
+        iter_rows(from_scraper), previous, load_model
+    )
+    urls = df["url"].tolist()
+    print(f"✅ {len(df)} rows, {embedded} embedded, {len(df) - embedded} reused")
+
+    if from_scraper:
+        df.to_csv(DATA_PATH, index=False, encoding="utf-8")
+        print(f"✅ Enriched data saved at: {DATA_PATH}")
+
+    rows = df.to_dict(orient="records")
+    record_hashes = [record_hash(record) for record in rows]
+
+    plan = plan_update(previous, urls, hashes, record_hashes, index_type, params)
+    if plan is not None:
+        if not (plan["added"] or plan["updated"] or plan["changed"] or plan["removed"]):
+            print(f"✅ Snapshot {previous['version']} is up to date")
+            if report:
+                write_report(vectors, eval_query_vectors(load_model()))
+            return
 
-    texts = df["embedding_text"].tolist()
+        # Catalog-only changes still publish: new catalog and lexical
+        # index over the same vectors
+        print(
+            f"📦 Updating FAISS index: +{len(plan['added'])} "
+            f"~{len(plan['updated'])} -{len(plan['removed'])}, "
+            f"{len(plan['changed'])} catalog-only changes"
+        )
+        index = update_index(previous, plan, vectors)
+        params = previous["meta"]["params"]
+    else:
+        print(f"📦 Building FAISS index ({index_type})...")
+        plan = {
+            "ids": np.arange(len(df), dtype="int64"),
+            "next_id": len(df),
+            "added": list(range(len(df))),
+            "updated": [],
+            "changed": [],
+            "removed": [],
+        }
+        index, params = index_types.build(vectors, index_type, params, ids=plan["ids"])
 
-    print("🧠 Loading embedding model...")
-    model = SentenceTransformer("all-MiniLM-L6-v2")
+    ids, next_id = plan["ids"], plan["next_id"]
 
-    print("⚡ Creating embeddings...")
-    embeddings = model.encode(texts, show_progress_bar=True)
-    embeddings = embeddings.astype("float32")
+    # FAISS ids are catalog rows; deleted ids stay as empty rows (no test
+    # types), so the intent selectors never return them
+    records = [{} for _ in range(next_id)]
+    for i, record in zip(ids, rows):
+        records[i] = record
+    catalog = Catalog.from_records(records)
+    lexical = LexicalIndex.from_records(records)
 
-    print("📦 Building FAISS index...")
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatIP(dim)
-    faiss.normalize_L2(embeddings)
-    index.add(embeddings)
+    aligned = np.zeros((next_id, vectors.shape[1]), dtype="float32")
+    aligned[ids] = vectors
 
-    Path("backend/vector_db").mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256(
+        json.dumps([index_type, params, sorted(zip(urls, hashes, record_hashes))])
+        .encode("utf-8")
+    ).hexdigest()
+    version = snapshots.new_version(digest)
 
-    faiss.write_index(index, INDEX_PATH)
+    meta = {
+        "version": version,
+        "parent": previous["version"] if previous else None,
+        "index_type": index_type,
+        "params": params,
+        "dim": int(vectors.shape[1]),
+        "ntotal": int(index.ntotal),
+        "model": MODEL_NAME,
+        "changes": {
+            "added": len(plan["added"]),
+            "updated": len(plan["updated"]),
+            "changed": len(plan["changed"]),
+            "removed": len(plan["removed"]),
+            "embedded": embedded,
+        },
+    }
+    state = {
+        "model": MODEL_NAME,
+        "next_id": int(next_id),
+        "rows": {
+            url: {"id": int(i), "hash": h, "record": r}
+            for url, i, h, r in zip(urls, ids, hashes, record_hashes)
+        },
+    }
 
-    metadata = df.to_dict(orient="records")
-    with open(META_PATH, "wb") as f:
-        pickle.dump(metadata, f)
+    def write(path):
+        faiss.write_index(index, str(path / snapshots.INDEX_FILE))
+        index_types.save_meta(meta, path / snapshots.META_FILE)
+        catalog.save(path / snapshots.CATALOG_SUBDIR)
+        lexical.save(path / snapshots.LEXICAL_SUBDIR)
+        np.save(path / snapshots.VECTORS_FILE, aligned)
+        with open(path / snapshots.ROWS_FILE, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+    path = snapshots.publish(version, write, keep=keep)
 
     print(f"✅ FAISS index saved ({index.ntotal} vectors)")
-    print("✅ Metadata saved")
+    print(f"✅ Catalog saved ({len(df)} entries, {next_id - len(df)} deleted ids)")
+    print(f"✅ Lexical index saved ({len(lexical.vocab)} terms)")
+    print(f"✅ Snapshot {version} is live at {path}")
+
+    if report:
+        write_report(vectors, eval_query_vectors(load_model()))
+
+
+def eval_query_vectors(model):
+    queries = set()
+    for path in EVAL_QUERY_PATHS:
+        queries.update(pd.read_csv(path)["Query"].dropna())
+
+    vectors = model.encode(sorted(queries)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def write_report(embeddings, query_vectors, k=10):
+    """Compare every index type against the exact flat baseline."""
+    print("📊 Comparing index types...")
+
+    # Catalog items double as queries so the comparison is not 19 rows deep
+    queries = np.vstack([query_vectors, embeddings])
+    k = min(k, len(embeddings))
+
+    flat, _ = index_types.build(embeddings, "flat")
+    _, truth = flat.search(queries, k)
+
+    report = {}
+    for index_type in index_types.INDEX_TYPES:
+        start = time.perf_counter()
+        index, params = index_types.build(embeddings, index_type)
+        build_s = time.perf_counter() - start
+
+        latencies = []
+        found = np.empty_like(truth)
+        for i, q in enumerate(queries):
+            start = time.perf_counter()
+            _, found[i] = index.search(q[None, :], k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        recall = np.mean([
+            len(set(found[i]) & set(truth[i])) / k for i in range(len(queries))
+        ])
+
+        report[index_type] = {
+            "params": params,
+            f"recall_at_{k}": round(float(recall), 4),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 4),
+            "build_s": round(build_s, 3),
+        }
+        print(
+            f"  {index_type:<6} recall@{k}={recall:.4f} "
+            f"p50={report[index_type]['p50_ms']:.3f}ms "
+            f"p95={report[index_type]['p95_ms']:.3f}ms"
+        )
+
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Report saved at {REPORT_PATH}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the SHL FAISS index")
+    parser.add_argument("--index-type", choices=index_types.INDEX_TYPES,
+                        default="flat")
+    parser.add_argument("--param", action="append", metavar="KEY=VALUE",
+                        help="override a build/search parameter, e.g. nprobe=4")
+    parser.add_argument("--report", action="store_true",
+                        help="write a recall/latency comparison of all index types")
+    parser.add_argument("--full", action="store_true",
+                        help="re-embed every row instead of updating the live snapshot")
+    parser.add_argument("--keep", type=int, default=snapshots.KEEP_SNAPSHOTS,
+                        help="number of snapshots to keep on disk")
+    parser.add_argument("--from-scraper", action="store_true",
+                        help="enrich the scraper CSV on the fly (also rewrites the enriched CSV)")
+    args = parser.parse_args()
+
+    build_faiss_index(args.index_type, parse_params(args.param), args.report,
+                      args.full, args.keep, args.from_scraper)
+
 
 if __name__ == "__main__":
-    build_faiss_index()
+    main()
@@ -0,0 +1,275 @@
+import json
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+
+CATALOG_DIR = Path(__file__).resolve().parent / "catalog"
+CATALOG_FORMAT = 1
+
+# Official SHL test type letters, one bit each in `type_mask`
+TEST_TYPES = ["A", "B", "C", "D", "E", "K", "P", "S"]
+TEST_TYPE_BITS = {t: 1 << i for i, t in enumerate(TEST_TYPES)}
+TEST_TYPE_NAMES = {
+    "A": "Ability & Aptitude",
+    "B": "Biodata & Situational Judgement",
+    "C": "Competencies",
+    "D": "Development & 360",
+    "E": "Assessment Exercises",
+    "K": "Knowledge & Skills",
+    "P": "Personality & Behavior",
+    "S": "Simulations"
+}
+
+TECHNICAL_BITS = TEST_TYPE_BITS["K"]
+BEHAVIORAL_BITS = TEST_TYPE_BITS["P"] | TEST_TYPE_BITS["C"] | TEST_TYPE_BITS["B"]
+
+# SHL job levels (product page "Job levels"), one bit each in `level_mask`
+JOB_LEVELS = [
+    "Director",
+    "Entry-Level",
+    "Executive",
+    "Front Line Manager",
+    "General Population",
+    "Graduate",
+    "Manager",
+    "Mid-Professional",
+    "Professional Individual Contributor",
+    "Supervisor",
+]
+JOB_LEVEL_BITS = {level: 1 << i for i, level in enumerate(JOB_LEVELS)}
+
+# Support flags and what the API reported before the catalog carried them.
+# The listing scrape never captured these (every row False), so a column
+# with no True value is unknown rather than "unsupported everywhere"
+FLAG_DEFAULTS = {"remote": "Yes", "adaptive": "No"}
+
+# Fixed-width columns, stored one .npy file each so they can be memory-mapped
+COLUMNS = {
+    "type_mask": "uint8",
+    "duration": "int32",        # minutes, 0 = unknown
+    "remote": "bool",
+    "adaptive": "bool",
+    "level_mask": "uint16",     # 0 = job levels unknown
+    "name_id": "int32",         # ids into the interned string table
+    "url_id": "int32",
+    "description_id": "int32",
+}
+
+
+def parse_list(raw):
+    """Accept a list or its stringified form ("['C', 'P']") and return its items."""
+    if isinstance(raw, str):
+        raw = raw.strip("[]")
+        return [
+            t.strip().strip("'").strip('"')
+            for t in raw.split(",")
+            if t.strip()
+        ]
+    if raw != raw:  # NaN from CSV
+        return []
+    return list(raw or [])
+
+
+def type_mask(letters):
+    mask = 0
+    for t in letters:
+        mask |= TEST_TYPE_BITS.get(t, 0)
+    return mask
+
+
+def level_mask(levels):
+    mask = 0
+    for level in levels:
+        mask |= JOB_LEVEL_BITS.get(level, 0)
+    return mask
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "1")
+    return bool(value) if value == value else False  # NaN -> False
+
+
+def _as_minutes(value):
+    try:
+        return max(int(float(value)), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class Catalog:
+    """Columnar catalog: NumPy columns plus an interned UTF-8 string table."""
+
+    def __init__(self, columns, strings, offsets):
+        self.columns = columns
+        self.strings = strings
+        self.offsets = offsets
+        for name, values in columns.items():
+            setattr(self, name, values)
+        self.unknown_flags = frozenset(
+            name for name in FLAG_DEFAULTS if not columns[name].any()
+        )
+
+    def __len__(self):
+        return len(self.type_mask)
+
+    # -------------------------------------------------
+    # BUILD / SAVE / LOAD
+    # -------------------------------------------------
+    @classmethod
+    def from_records(cls, records):
+        interned = {}
+
+        def intern(text):
+            text = "" if text is None or text != text else str(text)
+            if text not in interned:
+                interned[text] = len(interned)
+            return interned[text]
+
+        n = len(records)
+        columns = {name: np.zeros(n, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+        for i, r in enumerate(records):
+            columns["type_mask"][i] = type_mask(
+                parse_list(r.get("test_types_list", []))
+            )
+            columns["duration"][i] = _as_minutes(r.get("duration", 0))
+            columns["remote"][i] = _as_bool(r.get("remote_testing", False))
+            columns["adaptive"][i] = _as_bool(r.get("adaptive_irt", False))
+            columns["level_mask"][i] = level_mask(parse_list(r.get("job_levels", [])))
+            columns["name_id"][i] = intern(r.get("name"))
+            columns["url_id"][i] = intern(r.get("url"))
+            columns["description_id"][i] = intern(r.get("description", ""))
+
+        encoded = [s.encode("utf-8") for s in interned]
+        offsets = np.zeros(len(encoded) + 1, dtype="int64")
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        strings = np.frombuffer(b"".join(encoded), dtype="uint8")
+
+        return cls(columns, strings, offsets)
+
+    def save(self, path=CATALOG_DIR):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        for name, values in self.columns.items():
+            np.save(path / f"{name}.npy", np.ascontiguousarray(values))
+        np.save(path / "strings.npy", np.ascontiguousarray(self.strings))
+        np.save(path / "string_offsets.npy", self.offsets)
+
+        manifest = {
+            "format": CATALOG_FORMAT,
+            "count": len(self),
+            "test_types": TEST_TYPES,
+            "job_levels": JOB_LEVELS,
+            "columns": COLUMNS,
+        }
+        with open(path / "catalog.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load(cls, path=CATALOG_DIR, mmap=True):
+        path = Path(path)
+        mode = "r" if mmap else None
+
+        with open(path / "catalog.json", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != CATALOG_FORMAT:
+            raise ValueError(f"Unsupported catalog format: {manifest.get('format')}")
+
+        columns = {
+            name: np.load(path / f"{name}.npy", mmap_mode=mode)
+            for name in manifest["columns"]
+        }
+        # Catalogs saved before a column existed read it as all-unknown
+        for name, dtype in COLUMNS.items():
+            if name not in columns:
+                columns[name] = np.zeros(manifest["count"], dtype=dtype)
+        strings = np.load(path / "strings.npy", mmap_mode=mode)
+        offsets = np.load(path / "string_offsets.npy", mmap_mode=mode)
+        return cls(columns, strings, offsets)
+
+    # -------------------------------------------------
+    # ACCESSORS
+    # -------------------------------------------------
+    def string(self, sid):
+        start, end = self.offsets[sid], self.offsets[sid + 1]
+        return self.strings[start:end].tobytes().decode("utf-8")
+
+    def name(self, i):
+        return self.string(self.name_id[i])
+
+    def url(self, i):
+        return self.string(self.url_id[i])
+
+    def description(self, i):
+        return self.string(self.description_id[i])
+
+    def test_types(self, i):
+        mask = int(self.type_mask[i])
+        return [t for t in TEST_TYPES if mask & TEST_TYPE_BITS[t]]
+
+    def job_levels(self, i):
+        mask = int(self.level_mask[i])
+        return [level for level in JOB_LEVELS if mask & JOB_LEVEL_BITS[level]]
+
+    def mask(self, include_bits, exclude_bits=0, filters=None):
+        """
+        Boolean eligibility over all rows: any of include_bits, none of
+        exclude_bits, and the structured filters (unknown duration, job
+        levels or support flags pass).
+        """
+        eligible = (self.type_mask & include_bits) != 0
+        if exclude_bits:
+            eligible &= (self.type_mask & exclude_bits) == 0
+
+        if filters is not None and not filters.is_empty():
+            if filters.max_duration:
+                eligible &= (self.duration == 0) | (self.duration <= filters.max_duration)
+            if filters.remote and "remote" not in self.unknown_flags:
+                eligible &= self.remote
+            if filters.adaptive and "adaptive" not in self.unknown_flags:
+                eligible &= self.adaptive
+            if filters.job_levels:
+                eligible &= (self.level_mask == 0) | ((self.level_mask & filters.job_levels) != 0)
+
+        return eligible
+
+    def flag(self, name, i):
+        if name in self.unknown_flags:
+            return FLAG_DEFAULTS[name]
+        return "Yes" if self.columns[name][i] else "No"
+
+    def record(self, i):
+        types = self.test_types(i)
+        return {
+            "url": self.url(i),
+            "name": self.name(i),
+            "description": self.description(i),
+            "duration": int(self.duration[i]),
+            "adaptive_support": self.flag("adaptive", i),
+            "remote_support": self.flag("remote", i),
+            "test_types_list": types,
+            "test_types_full": [TEST_TYPE_NAMES[t] for t in types],
+            "job_levels": self.job_levels(i),
+        }
+
+    def records(self, indices):
+        return [self.record(int(i)) for i in indices]
+
+
+def main():
+    """Convert a legacy metadata.pkl into the columnar catalog."""
+    source = Path(sys.argv[1]) if len(sys.argv) > 1 else CATALOG_DIR.parent / "metadata.pkl"
+    with open(source, "rb") as f:
+        records = pickle.load(f)
+
+    catalog = Catalog.from_records(records)
+    catalog.save(CATALOG_DIR)
+    print(f"✅ Catalog saved at {CATALOG_DIR} ({len(catalog)} entries)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+from pathlib import Path
+
+from backend.rag.embedders import MODEL_NAME, ONNX_FILES, ONNX_MODEL_DIR
+
+OPSET = 14
+
+
+def export(output_dir=ONNX_MODEL_DIR, quantize=True):
+    """Export the MiniLM transformer (without pooling) plus its tokenizer."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print("🧠 Loading embedding model...")
+    model = SentenceTransformer(MODEL_NAME, device="cpu")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    # Writes tokenizer.json, which the `tokenizers` package reads without torch
+    tokenizer.save_pretrained(str(output_dir))
+
+    sample = tokenizer(
+        ["warmup query for java developer"], return_tensors="pt"
+    )
+    inputs = ("input_ids", "attention_mask", "token_type_ids")
+    dynamic = {"batch": 0, "sequence": 1}
+
+    model_path = output_dir / ONNX_FILES[False]
+    print(f"📦 Exporting {model_path}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in inputs),
+            str(model_path),
+            input_names=list(inputs),
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                **{name: dynamic for name in inputs},
+                "last_hidden_state": dynamic,
+            },
+            opset_version=OPSET,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = output_dir / ONNX_FILES[True]
+        print(f"📦 Quantizing weights to int8 → {quantized_path}...")
+        quantize_dynamic(str(model_path), str(quantized_path),
+                         weight_type=QuantType.QInt8)
+
+    print(f"✅ ONNX model saved in {output_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export the embedding model for SHL_EMBED_BACKEND=onnx"
+    )
+    parser.add_argument("--output-dir", default=str(ONNX_MODEL_DIR))
+    parser.add_argument("--no-quantize", action="store_true",
+                        help="skip the int8 model")
+    args = parser.parse_args()
+
+    export(args.output_dir, quantize=not args.no_quantize)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import json
+import math
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+INDEX_META_PATH = Path(__file__).resolve().parent / "index_meta.json"
+
+INDEX_TYPES = ("flat", "hnsw", "ivf", "ivfpq")
+# Types whose vectors can be deleted in place (HNSW graphs cannot)
+REMOVABLE_TYPES = ("flat", "ivf", "ivfpq")
+
+
+def default_params(index_type, n, dim):
+    """Reasonable build/search parameters for a catalog of n vectors."""
+    # FAISS wants ~39 training points per IVF list
+    nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+    if index_type == "hnsw":
+        return {"M": 32, "ef_construction": 200, "ef_search": 64}
+    if index_type == "ivf":
+        return {"nlist": nlist, "nprobe": max(1, nlist // 4)}
+    if index_type == "ivfpq":
+        return {
+            "nlist": nlist,
+            "nprobe": max(1, nlist // 4),
+            "m": 48 if dim % 48 == 0 else 16,
+            "nbits": max(1, min(8, int(math.log2(max(n // 39, 2))))),
+        }
+    return {}
+
+
+def build(embeddings, index_type="flat", params=None, ids=None):
+    """
+    Build an inner-product index over L2-normalized embeddings. With `ids`
+    the index is wrapped in an IndexIDMap2 so rows can later be removed
+    or replaced by id.
+    """
+    n, dim = embeddings.shape
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type}")
+
+    params = {**default_params(index_type, n, dim), **(params or {})}
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params["M"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params["ef_construction"]
+    elif index_type == "ivf":
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(
+            quantizer, dim, params["nlist"], faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(embeddings)
+    else:
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFPQ(
+            quantizer, dim, params["nlist"], params["m"], params["nbits"],
+            faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(embeddings)
+
+    if ids is not None:
+        index = faiss.IndexIDMap2(index)
+        index.add_with_ids(embeddings, np.asarray(ids, dtype="int64"))
+    else:
+        index.add(embeddings)
+    configure_search(index, {"index_type": index_type, "params": params})
+    return index, params
+
+
+def configure_search(index, meta):
+    """Apply search-time knobs (efSearch / nprobe) recorded at build time."""
+    params = meta.get("params", {})
+    space = faiss.ParameterSpace()
+
+    if meta.get("index_type") == "hnsw" and "ef_search" in params:
+        space.set_index_parameter(index, "efSearch", int(params["ef_search"]))
+    if meta.get("index_type") in ("ivf", "ivfpq") and "nprobe" in params:
+        space.set_index_parameter(index, "nprobe", int(params["nprobe"]))
+
+
+def search_parameters(meta, selector, index=None):
+    """
+    Per-search parameters restricting results to `selector`. They replace
+    the index-level knobs, so efSearch / nprobe are carried over explicitly.
+    """
+    if isinstance(index, faiss.IndexIDMap2):
+        # Selectors see internal positions; translate them to our ids here
+        # rather than letting IndexIDMap swap params.sel during each search
+        selector = faiss.IDSelectorTranslated(index.id_map, selector)
+
+    params = meta.get("params", {})
+    index_type = meta.get("index_type")
+
+    if index_type == "hnsw":
+        search_params = faiss.SearchParametersHNSW()
+        search_params.efSearch = int(params.get("ef_search", 16))
+    elif index_type in ("ivf", "ivfpq"):
+        search_params = faiss.SearchParametersIVF()
+        search_params.nprobe = int(params.get("nprobe", 1))
+    else:
+        search_params = faiss.SearchParameters()
+
+    search_params.sel = selector
+    # SWIG does not own `sel`; keep the Python object alive with the params
+    search_params.referenced_selector = selector
+    return search_params
+
+
+def save_meta(meta, path=INDEX_META_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_meta(path=INDEX_META_PATH):
+    path = Path(path)
+    if not path.exists():
+        return {"index_type": "flat", "params": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
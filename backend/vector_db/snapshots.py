@@ -0,0 +1,93 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+VECTOR_DB_DIR = Path(__file__).resolve().parent
+SNAPSHOT_ROOT = Path(os.getenv("SHL_SNAPSHOT_ROOT", VECTOR_DB_DIR / "snapshots"))
+
+# Names inside a snapshot directory (also the legacy flat layout in vector_db/)
+INDEX_FILE = "faiss.index"
+META_FILE = "index_meta.json"
+CATALOG_SUBDIR = "catalog"
+LEXICAL_SUBDIR = "lexical"       # BM25 postings over the same row ids
+VECTORS_FILE = "vectors.npy"     # id-aligned embeddings, reused by the next build
+ROWS_FILE = "rows.json"          # url -> {"id", "hash", "record"}
+CURRENT_FILE = "CURRENT"         # name of the live snapshot
+
+LEGACY_VERSION = "legacy"
+KEEP_SNAPSHOTS = 3
+
+
+def current_version(root=SNAPSHOT_ROOT):
+    try:
+        with open(Path(root) / CURRENT_FILE, encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve(root=SNAPSHOT_ROOT):
+    """(version, directory) of the live snapshot; pre-snapshot builds are 'legacy'."""
+    version = current_version(root)
+    if version is None:
+        return LEGACY_VERSION, VECTOR_DB_DIR
+    return version, Path(root) / version
+
+
+def new_version(digest, root=SNAPSHOT_ROOT):
+    version = f"{time.strftime('%Y%m%dT%H%M%S')}-{digest[:8]}"
+    candidate, n = version, 1
+    while (Path(root) / candidate).exists():
+        n += 1
+        candidate = f"{version}.{n}"
+    return candidate
+
+
+def load_rows(path):
+    path = Path(path) / ROWS_FILE
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def publish(version, write, root=SNAPSHOT_ROOT, keep=KEEP_SNAPSHOTS):
+    """
+    write(directory) fills a staging directory; it is then renamed into
+    place and CURRENT is switched with os.replace, so readers only ever
+    see a complete snapshot.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    staging = root / f".tmp-{version}"
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir()
+    write(staging)
+    os.replace(staging, root / version)
+
+    pointer = root / f".{CURRENT_FILE}.tmp"
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, root / CURRENT_FILE)
+
+    prune(root, keep, version)
+    return root / version
+
+
+def prune(root=SNAPSHOT_ROOT, keep=KEEP_SNAPSHOTS, current=None):
+    """Delete all but the newest `keep` snapshots (never the current one)."""
+    root = Path(root)
+    versions = sorted(
+        (p for p in root.iterdir() if p.is_dir() and not p.name.startswith(".")),
+        key=lambda p: p.stat().st_mtime,
+    )
+    # Servers that memory-mapped an old snapshot keep their pages after unlink
+    for path in versions[:-keep] if keep > 0 else versions:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)